@@ -1,6 +1,19 @@
 from src.app_factory import create_app
 
-app = create_app()
+_app = None
+
+def __getattr__(name):
+    """Build the WSGI app on first access to `app` (gunicorn app:app, flask --app app).
+
+    Spawned indexing workers re-import this module, so building the app at
+    import time would open the databases once per worker.
+    """
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,336 @@
+# Offline retrieval and chat benchmark.
+#
+# Indexes a synthetic (or fixture) catalog into a temporary Chroma directory
+# from an in-memory SQLite table standing in for MySQL, replays a query set
+# through ChromaHandler.search_products and chat_with_bot with a fake Ollama
+# client, and writes recall@k, MRR, latencies and indexing throughput to JSON.
+# It also runs the embedding parity check against the index it just built:
+# with the same backend on both sides every cosine must be ~1.0, otherwise
+# the check re-embeds different text than indexing did.
+#
+# Usage:
+#   python -m scripts.benchmark_retrieval [--products 500] [--output results.json]
+#                                         [--catalog catalog.json --queries queries.json]
+#                                         [--compare previous.json]
+#
+# Fixture catalogs are lists of {id, name_en, descr_en, descr2_en, tags_en};
+# query sets are lists of {query, relevant: [product ids]}.
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Same backend re-encoding the same text may only differ by float noise
+PARITY_SELF_TOLERANCE = 1e-4
+
+TYPES = {
+    'garage door': ['sectional', 'roller', 'tilt', 'side-hinged'],
+    'window': ['casement', 'tilt and turn', 'sliding', 'roof'],
+    'door': ['entrance', 'interior', 'patio', 'fire-rated'],
+    'gate': ['swing', 'sliding', 'pedestrian', 'cantilever']
+}
+MATERIALS = ['steel', 'aluminium', 'pvc', 'oak', 'composite']
+COLORS = ['anthracite', 'white', 'golden oak', 'black', 'walnut']
+FEATURES = [
+    'thermal insulation', 'burglar resistance class RC2', 'acoustic insulation',
+    'remote control', 'triple glazing', 'hidden hinges', 'passive house certification'
+]
+
+class SQLiteProductSource:
+    """Stand-in for MySQLHandler backed by an in-memory SQLite products table."""
+
+    COLUMNS = "id, name_en, descr_en, descr2_en, tags_en"
+
+    def __init__(self, products):
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name_en TEXT, descr_en TEXT, "
+            "descr2_en TEXT, tags_en TEXT, active TEXT DEFAULT '1')"
+        )
+        self.connection.executemany(
+            "INSERT INTO products (id, name_en, descr_en, descr2_en, tags_en) VALUES (?, ?, ?, ?, ?)",
+            [(p['id'], p['name_en'], p.get('descr_en'), p.get('descr2_en'), p.get('tags_en')) for p in products]
+        )
+
+    def _rows(self, query, params=()):
+        return [dict(row) for row in self.connection.execute(query, params)]
+
+    def fetch_active_products(self):
+        return self._rows(f"SELECT {self.COLUMNS} FROM products WHERE active = '1'")
+
+    def iter_active_products(self, batch_size=None):
+        from src.config.config import Config
+        batch_size = batch_size or Config.INDEXING_CHUNK_SIZE
+        cursor = self.connection.execute(f"SELECT {self.COLUMNS} FROM products WHERE active = '1' ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+
+    def count_active_products(self, filters=None):
+        return self.connection.execute("SELECT COUNT(*) FROM products WHERE active = '1'").fetchone()[0]
+
+    def get_product_by_id(self, product_id):
+        rows = self._rows(f"SELECT {self.COLUMNS} FROM products WHERE id = ?", (product_id,))
+        return rows[0] if rows else None
+
+class FakeOllama:
+    """Ollama client replacement returning canned answers with plausible usage stats."""
+
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+
+    @staticmethod
+    def _usage(prompt, completion):
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(completion) // 4)
+        return {
+            'done': True,
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': prompt_tokens * 1_000_000,
+            'eval_count': completion_tokens,
+            'eval_duration': completion_tokens * 20_000_000
+        }
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        time.sleep(self.latency_seconds)
+        prompt = messages[-1]['content']
+        if 'Analyze the user query' in prompt:
+            query = prompt.split('Analyze the user query:')[-1].split('Conversation history:')[0].strip()
+            content = f'```json\n{json.dumps({"products": [query], "attributes": [], "special_requirements": []})}\n```'
+        else:
+            content = "Here are the products that match your request."
+
+        if not stream:
+            return {'message': {'role': 'assistant', 'content': content}, **self._usage(prompt, content)}
+
+        def chunks():
+            words = content.split(' ')
+            for i, word in enumerate(words):
+                yield {'message': {'content': word + (' ' if i < len(words) - 1 else '')}, 'done': False}
+            yield {'message': {'content': ''}, **self._usage(prompt, content)}
+        return chunks()
+
+def generate_catalog(count, seed):
+    """Build a deterministic synthetic catalog and a query set with known answers."""
+    rng = random.Random(seed)
+    products, queries = [], []
+    for product_id in range(1, count + 1):
+        product_type = rng.choice(list(TYPES))
+        variant = rng.choice(TYPES[product_type])
+        material = rng.choice(MATERIALS)
+        color = rng.choice(COLORS)
+        features = rng.sample(FEATURES, 2)
+        sku = f"{product_type[:2].upper()}-{product_id:04d}{rng.choice('ABCXYZ')}"
+        products.append({
+            'id': product_id,
+            'name_en': f"{variant.title()} {material} {product_type} {sku}",
+            'descr_en': (
+                f"<p>The <strong>{variant} {product_type}</strong> is made of {material} "
+                f"and finished in {color}.</p><ul><li>{features[0]}</li><li>{features[1]}</li></ul>"
+            ),
+            'descr2_en': f"<p>Available in custom sizes. Model code {sku}.</p>",
+            'tags_en': f"{product_type}, {material}, {color}, {variant}"
+        })
+
+    by_attributes = {}
+    for product in products:
+        tags = [t.strip() for t in product['tags_en'].split(',')]
+        by_attributes.setdefault((tags[0], tags[1], tags[3]), []).append(str(product['id']))
+
+    # Exact SKU lookups and descriptive category queries
+    for product in rng.sample(products, min(40, len(products))):
+        sku = product['name_en'].rsplit(' ', 1)[-1]
+        queries.append({'query': f"do you have {sku}?", 'relevant': [str(product['id'])], 'kind': 'sku'})
+    for (product_type, material, variant), ids in rng.sample(sorted(by_attributes.items()), min(40, len(by_attributes))):
+        queries.append({'query': f"{variant} {material} {product_type}", 'relevant': ids, 'kind': 'category'})
+    return products, queries
+
+def percentiles(values):
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'mean': round(float(np.mean(values)), 2), 'p50': round(float(p50), 2),
+            'p95': round(float(p95), 2), 'p99': round(float(p99), 2)}
+
+def evaluate_retrieval(vector_db, queries, ks=(1, 5, 10)):
+    """Replay queries through search_products and score the rankings."""
+    per_query, latencies = [], []
+    recall = {k: [] for k in ks}
+    reciprocal_ranks = []
+    for item in queries:
+        start = time.perf_counter()
+        results = vector_db.search_products(item['query'])
+        latency_ms = (time.perf_counter() - start) * 1000
+        latencies.append(latency_ms)
+
+        ranked = [str(result['id']) for result in results]
+        relevant = set(item['relevant'])
+        for k in ks:
+            recall[k].append(len(relevant.intersection(ranked[:k])) / len(relevant))
+        first = next((rank for rank, pid in enumerate(ranked, 1) if pid in relevant), None)
+        reciprocal_ranks.append(1 / first if first else 0.0)
+        per_query.append({
+            'query': item['query'], 'kind': item.get('kind'), 'first_relevant_rank': first,
+            'latency_ms': round(latency_ms, 2)
+        })
+
+    summary = {f'recall@{k}': round(float(np.mean(values)), 4) for k, values in recall.items()}
+    summary['mrr'] = round(float(np.mean(reciprocal_ranks)), 4)
+    summary['latency_ms'] = percentiles(latencies)
+    for kind in sorted({q.get('kind') for q in per_query if q.get('kind')}):
+        ranks = [q['first_relevant_rank'] for q in per_query if q.get('kind') == kind]
+        summary[f'mrr_{kind}'] = round(float(np.mean([1 / r if r else 0.0 for r in ranks])), 4)
+    return summary, per_query
+
+def evaluate_chat(chat_with_bot, queries):
+    """Replay queries through chat_with_bot and aggregate stage timings."""
+    totals, stages = [], {}
+    for item in queries:
+        start = time.perf_counter()
+        result = chat_with_bot(item['query'], [])
+        totals.append((time.perf_counter() - start) * 1000)
+        for stage in result['debug_info'].get('timings', {}).get('spans', []):
+            stages.setdefault(stage['name'], []).append(stage['ms'])
+    return {
+        'queries': len(queries),
+        'latency_ms': percentiles(totals),
+        'stages_ms': {name: percentiles(values) for name, values in sorted(stages.items())}
+    }
+
+def compare(current, previous_path, recall_tolerance=0.02, latency_tolerance=0.2):
+    """Print differences against an earlier run and return the regressions found."""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    regressions = []
+    previous_retrieval = previous.get('retrieval', {})
+    for key, value in current['retrieval'].items():
+        if key.startswith(('recall@', 'mrr')) and key in previous_retrieval:
+            before = previous_retrieval[key]
+            print(f"{key}: {before} -> {value}")
+            if value < before - recall_tolerance:
+                regressions.append(f"{key} dropped from {before} to {value}")
+    for section in ('retrieval', 'chat'):
+        before = previous.get(section, {}).get('latency_ms', {}).get('p95')
+        after = current.get(section, {}).get('latency_ms', {}).get('p95')
+        if before and after:
+            print(f"{section} p95 latency: {before}ms -> {after}ms")
+            if after > before * (1 + latency_tolerance):
+                regressions.append(f"{section} p95 latency rose from {before}ms to {after}ms")
+    before = previous.get('indexing', {}).get('products_per_second')
+    after = current['indexing']['products_per_second']
+    if before:
+        print(f"indexing throughput: {before} -> {after} products/s")
+        if after < before * (1 - latency_tolerance):
+            regressions.append(f"indexing throughput fell from {before} to {after} products/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline retrieval and chat benchmark')
+    parser.add_argument('--products', type=int, default=500, help='Synthetic catalog size')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--catalog', help='Fixture catalog JSON instead of a synthetic one')
+    parser.add_argument('--queries', help='Fixture query set JSON')
+    parser.add_argument('--chat-queries', type=int, default=20, help='Queries replayed through chat_with_bot')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='Earlier results JSON to check for regressions')
+    args = parser.parse_args()
+
+    # Point the app at a throwaway vector store before any module reads the config.
+    # This runs in main() only: spawned indexing workers re-import this module
+    workdir = tempfile.mkdtemp(prefix='rag-benchmark-')
+    os.environ['CHROMA_DB_PATH'] = os.path.join(workdir, 'chroma')
+    os.environ['CONVERSATION_STORE'] = 'memory'
+    os.makedirs(os.environ['CHROMA_DB_PATH'], exist_ok=True)
+    from src.config.config import Config
+
+    products, queries = generate_catalog(args.products, args.seed)
+    if args.catalog:
+        with open(args.catalog) as f:
+            products = json.load(f)
+    if args.queries:
+        with open(args.queries) as f:
+            queries = json.load(f)
+
+    Config.COLLECTION_SWAP_GRACE_SECONDS = 0
+    Config.RESPONSE_CACHE_ENABLED = False  # Every chat query should do the full work
+
+    from src.handlers import chat_bot
+    from src.handlers.chroma_handler import vector_db
+    from src.services.product_service import product_service
+
+    chat_bot.ollama = FakeOllama()
+    product_service.mysql = SQLiteProductSource(products)
+
+    try:
+        # Start the cleaning workers outside the timed run; worker startup is a
+        # fixed cost, not indexing throughput. The run shuts them down again
+        warm_up = products[:Config.CLEANING_PARALLEL_MIN_BATCH]
+        product_service._clean_products(warm_up)
+
+        print(f"📝 Indexing {len(products)} products into {Config.CHROMA_DB_PATH}")
+        product_service._run_indexing('full')
+        status = product_service.get_indexing_progress()
+        if status.get('status') != 'completed':
+            print(f"❌ Indexing failed: {status.get('error')}")
+            sys.exit(1)
+        # Measured by the run's profiler, which stops before the pool shuts down
+        indexing_seconds = max(status['profile']['elapsed_seconds'], 0.1)
+
+        parity = product_service.check_embedding_parity()
+        retrieval, per_query = evaluate_retrieval(vector_db, queries)
+        chat = evaluate_chat(chat_bot.chat_with_bot, queries[:args.chat_queries])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'embedding_model': Config.EMBEDDING_MODEL,
+            'embedding_backend': Config.EMBEDDING_BACKEND,
+            'hybrid_search': Config.HYBRID_SEARCH_ENABLED,
+            'search_results_limit': Config.SEARCH_RESULTS_LIMIT,
+            'indexing_chunk_size': Config.INDEXING_CHUNK_SIZE
+        },
+        'catalog_size': len(products),
+        'query_count': len(queries),
+        'indexing': {
+            'seconds': round(indexing_seconds, 2),
+            'products_per_second': round(len(products) / indexing_seconds, 1),
+            'profile': status['profile']
+        },
+        'parity': parity,
+        'retrieval': retrieval,
+        'chat': chat,
+        'per_query': per_query
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps({k: results[k] for k in ('indexing', 'parity', 'retrieval', 'chat')}, indent=2))
+    print(f"✅ Results written to {args.output}")
+
+    failures = []
+    if parity.get('sample_size') and parity['max_drift'] > PARITY_SELF_TOLERANCE:
+        failures.append(
+            f"parity check against its own backend drifted by {parity['max_drift']} "
+            f"(mean cosine {parity['mean_cosine']}); it is not re-embedding the indexed text"
+        )
+    if args.compare:
+        failures.extend(compare(results, args.compare))
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# Compare the fast HTML stripper against BeautifulSoup on real product descriptions.
+# Usage: python -m scripts.verify_html_cleaning [limit]
+
+import sys
+import time
+from src.handlers.mysql_handler import mysql_db
+from src.handlers.data_processor import clean_html_fast, clean_html_bs4
+
+limit = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+checked = 0
+mismatches = []
+fast_seconds = 0.0
+bs4_seconds = 0.0
+
+for product in mysql_db.iter_active_products():
+    for field in ("descr_en", "descr2_en", "name_en", "tags_en"):
+        text = product.get(field) or ""
+
+        start = time.perf_counter()
+        fast = clean_html_fast(text)
+        fast_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        reference = clean_html_bs4(text)
+        bs4_seconds += time.perf_counter() - start
+
+        if fast != reference:
+            mismatches.append((product["id"], field, fast, reference))
+    checked += 1
+    if limit and checked >= limit:
+        break
+
+print(f"Checked {checked} products")
+print(f"bs4: {bs4_seconds:.3f}s, fast: {fast_seconds:.3f}s")
+print(f"Mismatches: {len(mismatches)}")
+for product_id, field, fast, reference in mismatches[:20]:
+    print(f"\n❌ Product {product_id} ({field})")
+    print(f"  fast: {fast[:200]!r}")
+    print(f"  bs4:  {reference[:200]!r}")
+
+sys.exit(1 if mismatches else 0)
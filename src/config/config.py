@@ -9,6 +9,15 @@ class Config:
     SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'default-secret-key')
     SESSION_LIFETIME_HOURS = 1
 
+    # Conversation Store Configuration
+    # The session cookie only carries a conversation ID; history lives server-side
+    CONVERSATION_STORE = os.getenv('CONVERSATION_STORE', 'memory')  # 'memory' or 'sqlite'
+    CONVERSATION_DB_PATH = os.getenv('CONVERSATION_DB_PATH', './conversations.sqlite3')
+    CONVERSATION_TTL_SECONDS = SESSION_LIFETIME_HOURS * 3600
+    CONVERSATION_MAX_MESSAGES = 10         # Recent messages kept for the extraction prompt
+    CONVERSATION_MAX_MENTIONED = 20        # Previously discussed products kept in the context
+    CONVERSATION_MAX_CONVERSATIONS = 10000  # In-memory store only
+
     # MySQL Configuration
     MYSQL_CONFIG = {
         "host": os.getenv('MYSQL_HOST', 'localhost'),
@@ -16,16 +25,50 @@ class Config:
         "password": os.getenv('MYSQL_PASSWORD'),
         "database": os.getenv('MYSQL_DATABASE')
     }
+    MYSQL_POOL_NAME = 'rag_chatbot'
+    MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 5))  # 0 disables pooling
+    MYSQL_STREAM_WRITE_TIMEOUT = 3600  # Seconds the server waits on a slow streaming reader
 
     # LLM Configuration
     OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'deepseek-r1:7b')
 
+    # Prompt Budget Configuration
+    # Token counts are estimated from text length; prompt size drives LLM prefill time
+    PROMPT_CHARS_PER_TOKEN = 4
+    PROMPT_PRODUCTS_TOKENS = int(os.getenv('PROMPT_PRODUCTS_TOKENS', 1500))
+    PROMPT_DESCRIPTION_TOKENS = 120      # Per product, before the budget runs low
+    PROMPT_MIN_DESCRIPTION_TOKENS = 30   # Per product, once the budget runs low
+    PROMPT_TAGS_TOKENS = 30
+    PROMPT_HISTORY_TOKENS = 150
+
     # Vector DB Configuration
     CHROMA_DB_PATH = os.getenv('CHROMA_DB_PATH', './chroma_db')
     CHROMA_COLLECTION_NAME = os.getenv('CHROMA_COLLECTION_NAME', 'products')
 
     # Embedding Model Configuration
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-mpnet-base-v2')
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')  # 'torch', 'onnx' or 'onnx-int8'
+    ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', './onnx_models')
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 2048))
+    EMBEDDING_PARITY_SAMPLE_SIZE = 200  # Stored vectors re-encoded by the parity check
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 64))
+
+    # Indexing Configuration
+    HTML_CLEANER = os.getenv('HTML_CLEANER', 'fast')  # 'fast' regex stripper or 'bs4'
+    CLEANING_WORKERS = int(os.getenv('CLEANING_WORKERS', min(4, os.cpu_count() or 1)))  # 0 cleans in-process
+    CLEANING_PARALLEL_MIN_BATCH = 64  # Smaller chunks aren't worth the inter-process overhead
+    INDEXING_CHUNK_SIZE = int(os.getenv('INDEXING_CHUNK_SIZE', 256))
+    # Seconds to reuse the MySQL active product count on the status endpoint
+    STATS_CACHE_TTL_SECONDS = int(os.getenv('STATS_CACHE_TTL_SECONDS', 30))
+    # Minimum share of active products a rebuilt collection must hold before it goes live
+    REINDEX_MIN_COVERAGE = float(os.getenv('REINDEX_MIN_COVERAGE', 0.99))
+    # Seconds to wait before dropping a replaced collection so in-flight queries can finish
+    COLLECTION_SWAP_GRACE_SECONDS = 5
+    INDEXING_ETA_WINDOW = 10  # Recent chunks whose throughput drives the ETA
+    INDEXING_HISTORY_PATH = os.getenv(
+        'INDEXING_HISTORY_PATH', os.path.join(CHROMA_DB_PATH, 'indexing_history.sqlite3')
+    )
+    INDEXING_HISTORY_MAX_RUNS = 50
 
     # Vector Search Configuration
     VECTOR_WEIGHTS = {
@@ -42,6 +85,16 @@ class Config:
         'NEW_QUERY': 0.2
     }
 
+    CATEGORY_FILTER_MIN_RESULTS = 3  # Fewer filtered hits than this widens the search to all categories
+
+    # Hybrid Search Configuration
+    # BM25 over names, tags and descriptions, fused with vector results by reciprocal rank
+    HYBRID_SEARCH_ENABLED = os.getenv('HYBRID_SEARCH_ENABLED', 'true').lower() == 'true'
+    LEXICAL_RESULTS_LIMIT = 10
+    HYBRID_RRF_K = 60
+    HYBRID_DENSE_WEIGHT = 1.0
+    HYBRID_LEXICAL_WEIGHT = 1.0
+
     # Product Types Configuration
     PRODUCT_TYPES = {
         'garage': ['garage', 'garage door', 'garage gates'],
@@ -50,5 +103,45 @@ class Config:
         'gate': ['gate', 'gates', 'brama', 'bramy']
     }
 
+    # Query Analyzer Configuration
+    # Resolve most queries locally and only call the extraction LLM when confidence is low
+    QUERY_ANALYZER_ENABLED = os.getenv('QUERY_ANALYZER_ENABLED', 'true').lower() == 'true'
+    QUERY_ANALYZER_MIN_SIMILARITY = 0.55
+    QUERY_ANALYZER_MIN_MARGIN = 0.05
+    PRODUCT_TYPE_QUERIES = {
+        'garage': 'garage doors',
+        'window': 'windows',
+        'door': 'doors',
+        'gate': 'gates'
+    }
+    QUERY_ATTRIBUTES = {
+        'color': ['color', 'colour', 'white', 'black', 'grey', 'gray', 'anthracite', 'wood'],
+        'size': ['size', 'dimension', 'dimensions', 'width', 'height', 'wide', 'tall'],
+        'insulation': ['insulation', 'insulated', 'thermal', 'warm'],
+        'interior': ['interior', 'inside', 'indoor'],
+        'exterior': ['exterior', 'outside', 'outdoor', 'entrance', 'front door'],
+        'price': ['price', 'cost', 'cheap', 'expensive', 'budget'],
+        'security': ['security', 'secure', 'burglar', 'anti-burglary']
+    }
+
+    # Chat Serving Configuration
+    CHAT_WORKERS = int(os.getenv('CHAT_WORKERS', 2))              # Concurrent LLM-backed chat jobs
+    CHAT_MAX_QUEUE = int(os.getenv('CHAT_MAX_QUEUE', 20))
+    CHAT_MAX_JOBS_PER_CLIENT = 1
+    CHAT_REQUEST_TIMEOUT_SECONDS = 60
+    CHAT_START_WAIT_SECONDS = 1  # /chat answers with a queue position if no worker picks the job up sooner
+    CHAT_STREAM_POLL_SECONDS = 1  # How often a queued stream reports its position
+    CHAT_RETRY_AFTER_SECONDS = 5
+    CHAT_JOB_TTL_SECONDS = 300
+
+    # Metrics Configuration
+    METRICS_WINDOW_SIZE = 1000  # Recent samples per stage used for latency percentiles
+
+    # Response Cache Configuration
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_SIMILARITY = 0.95
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 3600))
+    RESPONSE_CACHE_MAX_ENTRIES = 1000
+
     # URL Configuration
     BASE_URL = "https://aikondistribution.com/products" 
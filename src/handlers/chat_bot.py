@@ -1,15 +1,22 @@
 import re
+import time
 import ollama
 import logging
 from datetime import datetime
 from src.config.config import Config
 from src.handlers.chroma_handler import vector_db
+from src.handlers.query_analyzer import query_analyzer
+from src.handlers.keyword_matcher import product_type_matcher
+from src.handlers.embedding_handler import embeddings
+from src.handlers.response_cache import response_cache
+from src.handlers.metrics import RequestTrace, chat_metrics, record_llm_usage, span
+from src.handlers.prompt_builder import (
+    collapse_history, estimate_tokens, select_products, truncate_to_tokens
+)
 import json
 
 #todo add translation from and to english from any language
 
-#todo add compression of context to the llm 
-
 logging.basicConfig(
     filename='chat_bot.log',
     level=logging.INFO,
@@ -18,10 +25,72 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Words that already tell interior from exterior doors
+_DOOR_TYPE_WORDS = re.compile(r'\b(?:interior|exterior|inside|outside)\b', re.IGNORECASE)
+
 def clean_response(text):
     """Remove <think> sections and unwanted formatting from model responses."""
     return re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL).strip()
 
+class ThinkTagFilter:
+    """Incrementally remove <think>...</think> sections from a streamed response."""
+
+    OPEN_TAG = '<think>'
+    CLOSE_TAG = '</think>'
+
+    def __init__(self):
+        """Initialize an empty filter outside of any think section."""
+        self._buffer = ''
+        self._in_think = False
+        self._started = False
+
+    @staticmethod
+    def _partial_tag_length(text, tag):
+        """Length of the longest suffix of text that is a proper prefix of tag."""
+        for length in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:length]):
+                return length
+        return 0
+
+    def feed(self, chunk):
+        """Consume a streamed chunk and return the text that is safe to show."""
+        self._buffer += chunk
+        output = []
+        while True:
+            if self._in_think:
+                end = self._buffer.find(self.CLOSE_TAG)
+                if end == -1:
+                    # Only a partially received closing tag needs to be kept
+                    keep = self._partial_tag_length(self._buffer, self.CLOSE_TAG)
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                self._buffer = self._buffer[end + len(self.CLOSE_TAG):]
+                self._in_think = False
+            else:
+                start = self._buffer.find(self.OPEN_TAG)
+                if start == -1:
+                    safe = len(self._buffer) - self._partial_tag_length(self._buffer, self.OPEN_TAG)
+                    output.append(self._buffer[:safe])
+                    self._buffer = self._buffer[safe:]
+                    break
+                output.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(self.OPEN_TAG):]
+                self._in_think = True
+        return self._strip_leading(''.join(output))
+
+    def flush(self):
+        """Return any buffered visible text once the stream has ended."""
+        remaining = '' if self._in_think else self._buffer
+        self._buffer = ''
+        return self._strip_leading(remaining)
+
+    def _strip_leading(self, text):
+        """Drop whitespace before the first visible character, like clean_response does."""
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
 def extract_query_components_llm(query, conversation_history):
     """
     Use the model to extract possible multiple products, relevant attributes, 
@@ -69,6 +138,7 @@ def extract_query_components_llm(query, conversation_history):
     )
 
     logger.info(f"Raw LLM response: {response}")
+    record_llm_usage('extract', response)
 
     # Attempt to extract JSON from the response
     json_data = {"products": [], "attributes": [], "special_requirements": []}
@@ -88,45 +158,108 @@ def extract_query_components_llm(query, conversation_history):
     return json_data
 
 
+def extract_query_components(query, conversation_history):
+    """
+    Extract query components with the local analyzer, falling back to the
+    LLM only when the analyzer is disabled or not confident enough.
+    """
+    if Config.QUERY_ANALYZER_ENABLED:
+        try:
+            analyzed = query_analyzer.analyze(query)
+        except Exception as e:
+            logger.error(f"Local query analysis failed: {e}")
+            analyzed = None
+
+        if analyzed:
+            logger.info(f"Resolved query locally ({analyzed['source']}): {analyzed}")
+            return analyzed
+        logger.info("Local query analysis not confident, falling back to LLM")
+
+    extracted = extract_query_components_llm(query, conversation_history)
+    categories = []
+    for product in extracted.get("products", []):
+        for category in product_type_matcher.find_labels(product, longest=True):
+            if category not in categories:
+                categories.append(category)
+    extracted["categories"] = categories
+    extracted["source"] = "llm"
+    return extracted
+
+
+def new_history_context():
+    """Return the history context of an empty conversation."""
+    return {
+        'context': "",
+        'last_query': None,
+        'mentioned_in_order': [],
+        'mentioned_product_ids': []
+    }
+
+
+def update_history_context(history_context, message):
+    """Fold one more message into a history context in place and return it.
+
+    Conversation stores call this once per message, so the context never has
+    to be rebuilt from the whole history.
+    """
+    if message['role'] == 'user':
+        history_context['last_query'] = message['content']
+    elif message['role'] == 'assistant':
+        # Try to find any previously shared product links in the assistant messages
+        urls = re.findall(rf'{Config.BASE_URL}/([^)\s]+)', message['content'])
+        for url in urls:
+            # Just a naive example: parse the link structure to get a display name
+            product_name = url.split('-')[0].replace('-', ' ').title()
+            if product_name not in history_context['mentioned_in_order']:
+                history_context['mentioned_in_order'].append(product_name)
+            # Product URLs end with the product ID
+            product_id = url.rsplit('-', 1)[-1]
+            if product_id.isdigit() and product_id not in history_context['mentioned_product_ids']:
+                history_context['mentioned_product_ids'].append(product_id)
+
+        limit = Config.CONVERSATION_MAX_MENTIONED
+        del history_context['mentioned_in_order'][:-limit]
+        del history_context['mentioned_product_ids'][:-limit]
+        history_context['context'] = "\n".join(
+            f"Previously discussed: {name}" for name in history_context['mentioned_in_order']
+        )
+    return history_context
+
+
 def get_context_from_history(history):
     """Extract relevant context from conversation history, such as previously mentioned products."""
-    context = []
-    mentioned_products = set()
-    last_query = None
-    
+    history_context = new_history_context()
     for message in history:
-        if message['role'] == 'user':
-            last_query = message['content']
-        elif message['role'] == 'assistant':
-            # Try to find any previously shared product links in the assistant messages
-            urls = re.findall(rf'{Config.BASE_URL}/([^)\s]+)', message['content'])
-            for url in urls:
-                # Just a naive example: parse the link structure to get a display name
-                product_name = url.split('-')[0].replace('-', ' ').title()
-                if product_name not in mentioned_products:
-                    mentioned_products.add(product_name)
-                    context.append(f"Previously discussed: {product_name}")
-    
-    return {
-        'context': "\n".join(context),
-        'last_query': last_query,
-        'mentioned_products': mentioned_products
-    }
+        update_history_context(history_context, message)
+    return history_context
 
-def generate_response(query, products_list, conversation_history):
+
+def is_followup_query(query, last_query):
+    """Determine if the query refers back to the previous question."""
+    if not last_query:
+        return False
+    followup_indicators = ['it', 'this', 'that', 'these', 'those', 'they', 'them', 'the product']
+    return any(indicator in query.lower() for indicator in followup_indicators)
+
+
+def assemble_system_prompt(query, products_list, conversation_history, history_info=None):
     """
-    Generate a chatbot response using Ollama with the conversation context.
-    This is where we craft a persona and guidance for the LLM's final message.
+    Assemble the system prompt for the final answer, crafting a persona and
+    guidance for the LLM, with the history context collapsed to its token budget.
+
+    Pass history_info (e.g. from a conversation store) to skip re-parsing the history.
+
+    Returns:
+        tuple: (system prompt, approximate token count per section)
     """
-    history_info = get_context_from_history(conversation_history)
-    context = history_info['context']
+    if history_info is None:
+        history_info = get_context_from_history(conversation_history)
+    context = collapse_history(history_info['mentioned_in_order'])
     last_query = history_info['last_query']
-
-    # Determine if this is a follow-up
-    is_followup = False
-    if last_query:
-        followup_indicators = ['it', 'this', 'that', 'these', 'those', 'they', 'them', 'the product']
-        is_followup = any(indicator in query.lower() for indicator in followup_indicators)
+    is_followup = is_followup_query(query, last_query)
+    followup = ""
+    if is_followup:
+        followup = "Previous user question: " + truncate_to_tokens(last_query, Config.PROMPT_HISTORY_TOKENS)
 
     # Create a persona or brand voice in the system prompt
     system_prompt = f"""\
@@ -146,7 +279,7 @@ Important constraints:
 Conversation history context:
 {context}
 
-{"Previous user question: " + last_query if is_followup else ""}
+{followup}
 
 Product list for this conversation:
 {products_list}
@@ -154,8 +287,18 @@ Product list for this conversation:
 User's question: "{query}"
 """
 
-    logger.info(f"System prompt for final LLM response:\n{system_prompt}")
+    sections = {
+        'history': estimate_tokens(context) + estimate_tokens(followup),
+        'products': estimate_tokens(products_list),
+        'query': estimate_tokens(query)
+    }
+    total = estimate_tokens(system_prompt)
+    token_counts = {'instructions': max(total - sum(sections.values()), 0), **sections, 'total': total}
+    return system_prompt, token_counts
 
+
+def generate_response(system_prompt):
+    """Generate a chatbot response using Ollama from the assembled system prompt."""
     response = ollama.chat(
         model=Config.OLLAMA_MODEL,
         messages=[
@@ -164,10 +307,33 @@ User's question: "{query}"
             # But we are packing it into system_prompt for demonstration
         ]
     )
+    record_llm_usage('generate', response)
 
     return clean_response(response['message']['content'])
 
 
+def generate_response_stream(system_prompt):
+    """Stream the chatbot response token by token, with <think> sections removed."""
+    think_filter = ThinkTagFilter()
+
+    stream = ollama.chat(
+        model=Config.OLLAMA_MODEL,
+        messages=[{"role": "system", "content": system_prompt}],
+        stream=True
+    )
+    for chunk in stream:
+        if chunk.get('done'):
+            # The final chunk carries Ollama's token counts and timings
+            record_llm_usage('generate', chunk)
+        text = think_filter.feed(chunk['message']['content'])
+        if text:
+            yield text
+
+    text = think_filter.flush()
+    if text:
+        yield text
+
+
 def ask_for_clarification(unresolved_points):
     """
     Craft a response that asks the user for more details or clarifications
@@ -185,18 +351,23 @@ def ask_for_clarification(unresolved_points):
     return " ".join(clarifications)
 
 
-def chat_with_bot(query, conversation_history=[]):
+def _prepare_chat(query, conversation_history, history_info):
     """
-    Main orchestrator: 
+    Run every step before the final LLM call:
      1. Extract relevant info from the user's query,
      2. Determine if we need clarifications,
      3. Query the vector DB,
-     4. Generate a final persona-based response.
+     4. Assemble the system prompt.
+
+    Returns a dict with 'response' set when the conversation can be answered
+    without the final LLM call, otherwise 'system_prompt' for that call, and
+    'debug_info' holding the prompt product list and its token counts.
     """
     logger.info(f"New chat request received: {query}")
 
     # 1. Extract structured info from user query
-    extracted_info = extract_query_components_llm(query, conversation_history)
+    with span('extract_query'):
+        extracted_info = extract_query_components(query, conversation_history)
     products_mentioned = extracted_info["products"]  # multiple product categories
     attributes = extracted_info["attributes"]
     special_requirements = extracted_info["special_requirements"]
@@ -208,12 +379,11 @@ def chat_with_bot(query, conversation_history=[]):
     # A minimal example of clarifications if user says "door" but no mention of interior/exterior
     # You can expand upon this logic
     clarifications_needed = []
-    if "door" in [p.lower() for p in products_mentioned]:
-        # If the user didn't specify interior/exterior, we might ask
-        if not any(
-            a.lower() in ["interior", "exterior", "inside", "outside"] 
-            for a in attributes + special_requirements
-        ):
+    if "door" in extracted_info.get("categories", []):
+        # If the user didn't specify interior/exterior anywhere, we might ask;
+        # the LLM often keeps it in the product itself, e.g. "interior doors"
+        door_type_text = " ".join(products_mentioned + attributes + special_requirements + [query])
+        if not _DOOR_TYPE_WORDS.search(door_type_text):
             clarifications_needed.append("door_type")
 
     if len(products_mentioned) == 0:
@@ -247,19 +417,19 @@ def chat_with_bot(query, conversation_history=[]):
             }
         }
 
-    # 2. For each recognized product, we can fetch from the vector DB
-    #    We'll combine all returned results into a single list
-    all_product_links = []
-    for p in products_mentioned:
-        matched = vector_db.search_products(p, conversation_history)
-        logger.info(f"Matched products: {matched}")
-        all_product_links.extend(matched)
-        logger.info(f"All product links: {all_product_links}")
-    
-    # Deduplicate
-    all_product_links = list(set(all_product_links))
+    # 2. Fetch all recognized products from the vector DB in one batched query.
+    #    Results come back merged and deduplicated by product id; the raw query
+    #    also goes to the lexical index so exact names and SKUs are found.
+    #    Each product query is restricted to its own categories
+    query_categories = [product_type_matcher.find_labels(product, longest=True) for product in products_mentioned]
+    with span('retrieval'):
+        all_products = vector_db.search_products_multi(
+            products_mentioned, conversation_history, lexical_query=query,
+            categories=query_categories
+        )
+    logger.info(f"All matched products: {[product['id'] for product in all_products]}")
 
-    if not all_product_links:
+    if not all_products:
         return {
             "response": f"Sorry, I couldn't find any matching products for {products_mentioned}.",
             "debug_info": {
@@ -271,20 +441,151 @@ def chat_with_bot(query, conversation_history=[]):
             }
         }
 
-    # 3. Generate the final answer from the LLM, injecting the relevant product links
-    # We'll join all matching product links in one block
-    product_list_for_prompt = "\n".join(all_product_links)
-
-    final_bot_response = generate_response(query, product_list_for_prompt, conversation_history)
+    # Pack the best ranked products into the prompt's token budget
+    with span('prompt_build'):
+        product_list_for_prompt, prompt_products, dropped = select_products(all_products, query)
+        system_prompt, prompt_tokens = assemble_system_prompt(
+            query, product_list_for_prompt, conversation_history, history_info
+        )
+    logger.info(f"Prompt tokens: {prompt_tokens}, products dropped for budget: {dropped}")
+    logger.info(f"System prompt for final LLM response:\n{system_prompt}")
 
-    # 4. Return the final structured response
     return {
-        "response": final_bot_response,
+        "response": None,
+        "product_ids": [p['id'] for p in prompt_products],
+        "system_prompt": system_prompt,
         "debug_info": {
             "extracted_info": extracted_info,
             "query": query,
-            "products_found": all_product_links,
+            "products_found": [p['metadata'].get('url') or p['id'] for p in all_products],
             "attributes_found": attributes,
-            "prompt": product_list_for_prompt
+            "prompt": product_list_for_prompt,
+            "prompt_tokens": prompt_tokens,
+            "products_in_prompt": len(prompt_products),
+            "products_dropped": dropped
         }
     }
+
+
+def _lookup_cached_response(query, history_info, prepared):
+    """
+    Look up a semantically similar earlier answer for the same products and
+    conversation context.
+
+    Returns:
+        tuple: (cached_response or None, cache_key to store a new response under)
+    """
+    if not Config.RESPONSE_CACHE_ENABLED:
+        return None, None
+
+    query_vector = embeddings.encode_query(query)
+    if query_vector is None:
+        return None, None
+
+    # The prompt depends on history only through its context and a follow-up question
+    context_key = history_info['context']
+    if is_followup_query(query, history_info['last_query']):
+        context_key += "\n" + history_info['last_query']
+
+    cache_key = (query_vector, prepared["product_ids"], context_key)
+    with span('response_cache'):
+        return response_cache.get(*cache_key), cache_key
+
+
+def chat_with_bot(query, conversation_history=[], history_context=None):
+    """
+    Main orchestrator: retrieve matching products, then generate a final
+    persona-based response.
+    """
+    trace = RequestTrace()
+    with trace.activate(), span('chat_total'):
+        # A conversation store passes its precomputed context; otherwise parse the history
+        history_info = history_context
+        if history_info is None:
+            history_info = get_context_from_history(conversation_history)
+        prepared = _prepare_chat(query, conversation_history, history_info)
+        debug_info = prepared["debug_info"]
+        if prepared["response"] is not None:
+            debug_info["timings"] = trace.to_dict()
+            return prepared
+
+        cached_response, cache_key = _lookup_cached_response(query, history_info, prepared)
+        debug_info["response_cache"] = "hit" if cached_response else "miss"
+        if cached_response:
+            logger.info("Serving response from semantic cache")
+            debug_info["timings"] = trace.to_dict()
+            return {"response": cached_response, "debug_info": debug_info}
+
+        # Generate the final answer from the LLM, injecting the relevant product links
+        with span('llm_generate'):
+            final_bot_response = generate_response(prepared["system_prompt"])
+        if cache_key and final_bot_response:
+            response_cache.put(*cache_key, final_bot_response)
+
+        debug_info["timings"] = trace.to_dict()
+        logger.info(f"Chat timings: {debug_info['timings']}")
+
+    # Return the final structured response
+    return {
+        "response": final_bot_response,
+        "debug_info": debug_info
+    }
+
+
+def chat_with_bot_stream(query, conversation_history=[], history_context=None):
+    """
+    Streaming variant of chat_with_bot.
+
+    Yields 'token' events as the final answer is generated, followed by one
+    'done' event carrying the full response and debug info.
+    """
+    trace = RequestTrace()
+    # The trace is only active while this generator runs, never across a yield
+    with trace.activate():
+        # A conversation store passes its precomputed context; otherwise parse the history
+        history_info = history_context
+        if history_info is None:
+            history_info = get_context_from_history(conversation_history)
+        prepared = _prepare_chat(query, conversation_history, history_info)
+        debug_info = prepared["debug_info"]
+        cached_response, cache_key = None, None
+        if prepared["response"] is None:
+            cached_response, cache_key = _lookup_cached_response(query, history_info, prepared)
+            debug_info["response_cache"] = "hit" if cached_response else "miss"
+
+    answer = prepared["response"] or cached_response
+    if answer is not None:
+        if cached_response:
+            logger.info("Serving response from semantic cache")
+        debug_info["timings"] = trace.to_dict()
+        chat_metrics.record('chat_total', debug_info["timings"]["total_ms"] / 1000)
+        yield {"type": "token", "content": answer}
+        yield {"type": "done", "response": answer, "debug_info": debug_info}
+        return
+
+    parts = []
+    stream = generate_response_stream(prepared["system_prompt"])
+    start = time.perf_counter()
+    while True:
+        with trace.activate():
+            token = next(stream, None)
+        if token is None:
+            break
+        if not parts:
+            first_token_seconds = time.perf_counter() - start
+            trace.add_span('llm_first_token', first_token_seconds)
+            chat_metrics.record('llm_first_token', first_token_seconds)
+        parts.append(token)
+        yield {"type": "token", "content": token}
+    generate_seconds = time.perf_counter() - start
+    trace.add_span('llm_generate', generate_seconds)
+    chat_metrics.record('llm_generate', generate_seconds)
+
+    final_bot_response = "".join(parts).strip()
+    if cache_key and final_bot_response:
+        response_cache.put(*cache_key, final_bot_response)
+
+    debug_info["timings"] = trace.to_dict()
+    chat_metrics.record('chat_total', debug_info["timings"]["total_ms"] / 1000)
+    logger.info(f"Chat timings: {debug_info['timings']}")
+    yield {"type": "done", "response": final_bot_response, "debug_info": debug_info}
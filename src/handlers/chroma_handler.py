@@ -1,86 +1,537 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime
 import chromadb
+import numpy as np
 from src.config.config import Config
-from src.handlers.embedding_handler import EmbeddingHandler
+from src.handlers.embedding_handler import embeddings
+from src.handlers.lexical_index import LexicalIndex
+from src.handlers.metrics import span
+
 class ChromaHandler:
     """Handler for vector database operations using ChromaDB."""
     
     def __init__(self):
         """Initialize ChromaDB handler."""
         self.client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
-        self.collection = self.client.get_or_create_collection(Config.CHROMA_COLLECTION_NAME)
+        self._pointer_path = os.path.join(Config.CHROMA_DB_PATH, 'active_collection.json')
+        self._swap_lock = threading.Lock()
+        self._pointer_lock = threading.Lock()
+        self._pointer_signature = self._stat_pointer()
+        self.collection_name = self._read_active_collection_name()
+        self._collection = self.client.get_or_create_collection(self.collection_name)
+        self._stats_lock = threading.Lock()
+        self._stats_cache = {}
+        self._changes = 0
+        self._lexical_lock = threading.Lock()
+        self._lexical_indexes = {}
+
+    @property
+    def collection(self):
+        """The active collection, reloaded when another process has switched it."""
+        self._refresh_active_collection()
+        return self._collection
+
+    @collection.setter
+    def collection(self, collection):
+        self._collection = collection
+
+    def _stat_pointer(self):
+        """Return (inode, mtime) of the active collection pointer, or None if there is none."""
+        try:
+            stat = os.stat(self._pointer_path)
+            return (stat.st_ino, stat.st_mtime_ns)
+        except OSError:
+            return None
+
+    def _refresh_active_collection(self):
+        """Follow the pointer file when another process activated or recreated a collection.
+
+        Every worker process holds its own collection handle and lexical
+        index; a stat of the pointer file per access keeps them from
+        searching a collection that the indexing process has since dropped.
+        """
+        signature = self._stat_pointer()
+        if signature == self._pointer_signature:
+            return
+        with self._pointer_lock:
+            signature = self._stat_pointer()
+            if signature == self._pointer_signature:
+                return
+            previous_name = self.collection_name
+            name = self._read_active_collection_name()
+            self._collection = self.client.get_or_create_collection(name)
+            self.collection_name = name
+            self._pointer_signature = signature
+        with self._lexical_lock:
+            # Reload lexical indexes from disk; they were written by the other process
+            self._lexical_indexes.pop(previous_name, None)
+            self._lexical_indexes.pop(name, None)
+        self._invalidate_stats()
+        print(f"📝 Active collection changed by another process: {previous_name} -> {name}")
+
+    def _invalidate_stats(self):
+        """Forget cached counts after the active collection changed."""
+        with self._stats_lock:
+            self._stats_cache.clear()
+            self._changes += 1
+
+    def get_index_version(self):
+        """Return a token that changes whenever the active collection is modified."""
+        self._refresh_active_collection()
+        return f"{self.collection_name}:{self._changes}"
+
+    def _cached_stat(self, key, compute):
+        """Return a cached statistic, computing it on first use after invalidation.
+
+        The value is computed outside the lock, so it is only cached if the
+        index did not change meanwhile; otherwise it could be stale.
+        """
+        with self._stats_lock:
+            if key in self._stats_cache:
+                return self._stats_cache[key]
+            generation = self._changes
+        value = compute()
+        with self._stats_lock:
+            if self._changes == generation:
+                self._stats_cache[key] = value
+        return value
 
-    def add_product(self, product_id, embedding_result):
-        """Add a product to the vector database."""
+    def _read_active_collection_name(self):
+        """Read the name of the active collection, defaulting to the configured one."""
+        try:
+            with open(self._pointer_path) as f:
+                return json.load(f)['collection']
+        except (OSError, ValueError, KeyError):
+            return Config.CHROMA_COLLECTION_NAME
+
+    def _write_active_collection_name(self, name):
+        """Persist the active collection pointer atomically."""
+        tmp_path = f"{self._pointer_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'collection': name, 'activated_at': datetime.now().isoformat()}, f)
+        os.replace(tmp_path, self._pointer_path)
+        # This process already uses the new collection; don't reload it
+        self._pointer_signature = self._stat_pointer()
+
+    def create_shadow_collection(self):
+        """Create a new versioned collection to build a full index into."""
+        name = f"{Config.CHROMA_COLLECTION_NAME}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        collection = self.client.create_collection(name)
+        print(f"📝 Created shadow collection: {name}")
+        return collection
+
+    def activate_collection(self, collection):
+        """Switch searches over to the given collection and return the previous name."""
+        with self._swap_lock:
+            previous_name = self.collection_name
+            self._write_active_collection_name(collection.name)
+            self.collection = collection
+            self.collection_name = collection.name
+        self._invalidate_stats()
+        print(f"✅ Active collection switched from {previous_name} to {collection.name}")
+        return previous_name
+
+    def drop_collection(self, name):
+        """Delete a collection that is not the active one."""
+        if name == self.collection_name:
+            print(f"❌ Refusing to drop the active collection {name}")
+            return False
+        try:
+            self.client.delete_collection(name)
+            with self._lexical_lock:
+                self._lexical_indexes.pop(name, None)
+            LexicalIndex(self._lexical_index_path(name)).delete()
+            print(f"✅ Dropped collection {name}")
+            return True
+        except Exception as e:
+            print(f"❌ Error dropping collection {name}: {str(e)}")
+            return False
+
+    def _is_product_collection(self, name):
+        """Check whether a collection is the base product collection or one of its shadows."""
+        shadow_name = re.compile(rf"{re.escape(Config.CHROMA_COLLECTION_NAME)}_\d{{14}}")
+        return name == Config.CHROMA_COLLECTION_NAME or shadow_name.fullmatch(name) is not None
+
+    def garbage_collect_collections(self):
+        """Drop every product collection except the active one."""
+        for collection in self.client.list_collections():
+            if self._is_product_collection(collection.name) and collection.name != self.collection_name:
+                self.drop_collection(collection.name)
+
+    def _lexical_index_path(self, name):
+        """Path of the persisted lexical index for a collection."""
+        return os.path.join(Config.CHROMA_DB_PATH, f'lexical_{name}.json')
+
+    def get_lexical_index(self, collection=None):
+        """Return the BM25 index that mirrors a collection, loading it on first use.
+
+        Collections indexed before hybrid search existed get their lexical
+        index rebuilt from the stored metadata.
+        """
+        if collection is None:
+            collection = self.collection
+        index = self._lexical_indexes.get(collection.name)
+        if index is not None:
+            return index
+
+        with self._lexical_lock:
+            if collection.name not in self._lexical_indexes:
+                index = LexicalIndex(self._lexical_index_path(collection.name))
+                if not index.load():
+                    results = collection.get(include=['metadatas'])
+                    index.add_documents(results['ids'], [
+                        {
+                            'name_clean': (metadata or {}).get('name', ''),
+                            'tags_clean': (metadata or {}).get('tags', ''),
+                            'description_clean': (metadata or {}).get('description', '')
+                        }
+                        for metadata in results['metadatas']
+                    ])
+                    index.save()
+                    print(f"📝 Rebuilt lexical index for {collection.name}: {len(index)} products")
+                self._lexical_indexes[collection.name] = index
+            return self._lexical_indexes[collection.name]
+
+    def save_lexical_index(self, collection=None):
+        """Persist the lexical index of a collection after a batch of writes."""
+        self.get_lexical_index(collection).save()
+
+    def _build_url(self, product_id, embedding_result):
+        """Build the public product URL from its cleaned name and ID."""
+        return f"{Config.BASE_URL}/{embedding_result['name_clean'].replace(' ', '-').lower()}-{product_id}"
+
+    def _build_metadata(self, url, embedding_result):
+        """Build the metadata stored alongside a product embedding."""
+        metadata = {
+            "name": embedding_result['name_clean'],
+            "url": url,
+            "tags": embedding_result['tags_clean'],
+            "product_type": embedding_result['product_type'],
+            "description": embedding_result['description_clean']
+        }
+        if embedding_result.get('content_hash'):
+            metadata["content_hash"] = embedding_result['content_hash']
+        # One flag per detected category so searches can filter with a where clause
+        for category in embedding_result['product_type'].split():
+            metadata[f"type_{category}"] = True
+        return metadata
+
+    def add_product(self, product_id, embedding_result, upsert=False, collection=None):
+        """Add a product to the vector database, or replace it when upsert is set."""
+        if collection is None:
+            collection = self.collection
         try:
             print(f"📝 Embedding result: {embedding_result}")
-            url = f"{Config.BASE_URL}/{embedding_result['name_clean'].replace(' ', '-').lower()}-{product_id}"
+            url = self._build_url(product_id, embedding_result)
             
-            self.collection.add(
+            write = collection.upsert if upsert else collection.add
+            write(
                 ids=[str(product_id)],
                 embeddings=[embedding_result['embedding']],
-                metadatas=[{
-                    "name": embedding_result['name_clean'],
-                    "url": url,
-                    "tags": embedding_result['tags_clean'],
-                    "product_type": embedding_result['product_type'],
-                    "description": embedding_result['description_clean']
-                }]
+                metadatas=[self._build_metadata(url, embedding_result)]
             )
+            self.get_lexical_index(collection).add_documents([product_id], [embedding_result])
+            if collection is self.collection:
+                # Writes into a shadow collection don't change what is being served
+                self._invalidate_stats()
             return url
         except Exception as e:
             print(f"❌ Error adding product to vector database: {str(e)}")
             return None
 
-    def search_products(self, query, conversation_history=[]):
-        """Search for products using vector similarity."""
+    def add_products(self, product_ids, embedding_results, upsert=False, collection=None):
+        """Add (or upsert) a chunk of products to the vector database in a single call.
+
+        Writes go to the active collection unless another collection is given.
+        """
+        if collection is None:
+            collection = self.collection
         try:
-            query_vector = EmbeddingHandler().encode_query(query)
-            results = self.collection.query(
-                query_embeddings=[query_vector],
+            urls = [
+                self._build_url(product_id, result)
+                for product_id, result in zip(product_ids, embedding_results)
+            ]
+
+            write = collection.upsert if upsert else collection.add
+            write(
+                ids=[str(product_id) for product_id in product_ids],
+                embeddings=[result['embedding'] for result in embedding_results],
+                metadatas=[
+                    self._build_metadata(url, result)
+                    for url, result in zip(urls, embedding_results)
+                ]
+            )
+            self.get_lexical_index(collection).add_documents(product_ids, embedding_results)
+            if collection is self.collection:
+                # Writes into a shadow collection don't change what is being served
+                self._invalidate_stats()
+            print(f"✅ {len(product_ids)} products added to vector database")
+            return urls
+        except Exception as e:
+            print(f"❌ Error adding products to vector database: {str(e)}")
+            return None
+
+    @staticmethod
+    def _category_where(categories):
+        """Build a where clause matching products of any of the given categories."""
+        clauses = [{f"type_{category}": True} for category in categories]
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    @staticmethod
+    def _matches_categories(metadata, categories):
+        """Check whether stored metadata is flagged with any of the categories."""
+        return any((metadata or {}).get(f"type_{category}") for category in categories)
+
+    def _query_with_fallback(self, query_vectors, query_categories=None):
+        """Query the collection, restricting each query to its own categories when possible.
+
+        Args:
+            query_vectors (list): Query embeddings
+            query_categories (list): Category labels per query vector (an
+                empty list or None searches everything for that query)
+
+        Queries sharing the same categories are sent together, one
+        collection.query per distinct filter. Queries that get fewer than
+        CATEGORY_FILTER_MIN_RESULTS hits with their filter (e.g. an index
+        built before category flags existed) are re-run against the whole
+        collection.
+        """
+        query_categories = query_categories or [None] * len(query_vectors)
+        results = {key: [[] for _ in query_vectors] for key in ("ids", "distances", "metadatas")}
+
+        groups = {}
+        for i, categories in enumerate(query_categories):
+            groups.setdefault(tuple(categories or ()), []).append(i)
+
+        widen = []
+        for categories, indices in groups.items():
+            kwargs = {'where': self._category_where(categories)} if categories else {}
+            try:
+                group_results = self.collection.query(
+                    query_embeddings=[query_vectors[i] for i in indices],
+                    n_results=Config.SEARCH_RESULTS_LIMIT,
+                    **kwargs
+                )
+            except Exception as e:
+                if not categories:
+                    raise
+                print(f"⚠️ Filtered search failed, searching all categories: {str(e)}")
+                widen.extend(indices)
+                continue
+            for position, i in enumerate(indices):
+                for key in results:
+                    results[key][i] = group_results[key][position]
+                if categories and len(results["ids"][i]) < Config.CATEGORY_FILTER_MIN_RESULTS:
+                    widen.append(i)
+
+        if widen:
+            print(f"📝 Widening {len(widen)} of {len(query_vectors)} queries beyond their categories")
+            wide = self.collection.query(
+                query_embeddings=[query_vectors[i] for i in widen],
                 n_results=Config.SEARCH_RESULTS_LIMIT
             )
+            for position, i in enumerate(widen):
+                for key in results:
+                    results[key][i] = wide[key][position]
+        return results
 
-            print(f"📝 Search results: {len(results['ids'])}")
+    def search_products(self, query, conversation_history=[], categories=None):
+        """Search for products using vector similarity, fused with BM25 when hybrid search is on.
 
-            if not results["ids"] or not results["ids"][0]:
+        With categories (product type labels), only products of those types
+        are searched unless too few of them match.
+        """
+        try:
+            with span('query_encoding'):
+                query_vector = embeddings.encode_query(query)
+            if query_vector is None:
                 return []
+            with span('vector_query'):
+                results = self._query_with_fallback([query_vector], [categories])
+
+            print(f"📝 Search results: {len(results['ids'])}")
 
             products = []
-            scores = results["distances"][0]
-            min_score = min(scores)
-            max_score = max(scores)
-            
-            threshold_multiplier = (Config.SEARCH_THRESHOLD_MULTIPLIER['FOLLOW_UP'] 
-                                if len(conversation_history) > 0 
-                                else Config.SEARCH_THRESHOLD_MULTIPLIER['NEW_QUERY'])
-            threshold = min_score + (max_score - min_score) * threshold_multiplier
+            if results["ids"] and results["ids"][0]:
+                products = self._filter_results(
+                    results["ids"][0],
+                    results["distances"][0],
+                    results["metadatas"][0],
+                    conversation_history
+                )
 
-            print(f"📝 Threshold: {threshold}")
+            if Config.HYBRID_SEARCH_ENABLED:
+                with span('lexical_fusion'):
+                    return self._fuse_results([products], [query], [query_vector], [categories])
+            return products
+        except Exception as e:
+            print(f"❌ Error searching vector database: {str(e)}")
+            return []
 
-            for i in range(len(results["ids"][0])):
-                score = scores[i]
-                if score > threshold:
-                    continue
+    def search_products_multi(self, queries, conversation_history=[], lexical_query=None, categories=None):
+        """Search for several queries in one round-trip and merge the results.
 
-                product_id = results['ids'][0][i]
-                metadata = results["metadatas"][0][i]
-                
-                products.append({
-                    'id': product_id,
-                    'score': score,
-                    'metadata': {
-                        'name_clean': metadata['name'],
-                        'description_clean': metadata['description'],
-                        'tags_clean': metadata.get('tags', ''),
-                        'product_type': metadata.get('product_type', '')
-                    }
-                })
+        All queries are embedded in a single batch and sent as one
+        collection.query per category filter. Results are deduplicated by
+        product ID, keeping the best score, and returned sorted by score. With
+        hybrid search the queries, plus lexical_query (e.g. the user's
+        original message), are also run against the BM25 index and the
+        rankings are fused instead.
 
-            return products
+        Args:
+            categories (list): Category labels per query, restricting each
+                query as in search_products; lexical_query is restricted to
+                all of them together
+        """
+        try:
+            categories = categories or [None] * len(queries)
+            with span('query_encoding'):
+                vectors = embeddings.encode_queries(queries)
+            encoded = [
+                (query, vector, query_categories)
+                for query, vector, query_categories in zip(queries, vectors, categories)
+                if vector is not None
+            ]
+            if not encoded:
+                return []
+            query_vectors = [vector for _, vector, _ in encoded]
+
+            with span('vector_query'):
+                results = self._query_with_fallback(
+                    query_vectors, [query_categories for _, _, query_categories in encoded]
+                )
+
+            dense_lists = [
+                self._filter_results(ids, distances, metadatas, conversation_history)
+                for ids, distances, metadatas in zip(
+                    results["ids"], results["distances"], results["metadatas"]
+                )
+                if ids
+            ]
+
+            if Config.HYBRID_SEARCH_ENABLED:
+                lexical_queries, lexical_categories = [], []
+                for query, _, query_categories in encoded:
+                    if isinstance(query, str) and query:
+                        lexical_queries.append(query)
+                        lexical_categories.append(query_categories)
+                if lexical_query:
+                    all_categories = []
+                    for _, _, query_categories in encoded:
+                        if not query_categories:
+                            # One unrestricted query leaves the message unrestricted too
+                            all_categories = None
+                            break
+                        all_categories += [c for c in query_categories if c not in all_categories]
+                    lexical_queries.append(lexical_query)
+                    lexical_categories.append(all_categories)
+                with span('lexical_fusion'):
+                    fused = self._fuse_results(dense_lists, lexical_queries, query_vectors, lexical_categories)
+                print(f"📝 Hybrid multi-query search: {len(query_vectors)} queries, {len(fused)} products")
+                return fused
+
+            merged = {}
+            for products in dense_lists:
+                for product in products:
+                    current = merged.get(product['id'])
+                    if current is None or product['score'] < current['score']:
+                        merged[product['id']] = product
+
+            print(f"📝 Multi-query search: {len(query_vectors)} queries, {len(merged)} unique products")
+            return sorted(merged.values(), key=lambda product: product['score'])
         except Exception as e:
             print(f"❌ Error searching vector database: {str(e)}")
             return []
 
+    def _fuse_results(self, dense_lists, lexical_queries, query_vectors, lexical_categories=None):
+        """Combine dense and BM25 rankings with weighted reciprocal rank fusion.
+
+        Products found only lexically are fetched from the collection and get
+        their distance to the closest query vector as 'score', so every result
+        keeps the same shape. When lexical_categories gives categories for a
+        lexical query, its lexical-only hits must carry one of their type_*
+        flags. Results are ordered by 'fusion_score'.
+        """
+        k = Config.HYBRID_RRF_K
+        fused = {}
+        products = {}
+
+        for ranked in dense_lists:
+            for rank, product in enumerate(ranked):
+                fused[product['id']] = fused.get(product['id'], 0.0) + Config.HYBRID_DENSE_WEIGHT / (k + rank + 1)
+                current = products.get(product['id'])
+                if current is None or product['score'] < current['score']:
+                    products[product['id']] = product
+
+        lexical_index = self.get_lexical_index()
+        lexical_categories = lexical_categories or [None] * len(lexical_queries)
+        lexical_only = {}  # Product ID -> categories of the queries that found it, None if unrestricted
+        for text, categories in zip(lexical_queries, lexical_categories):
+            for rank, (product_id, _) in enumerate(lexical_index.search(text, Config.LEXICAL_RESULTS_LIMIT)):
+                fused[product_id] = fused.get(product_id, 0.0) + Config.HYBRID_LEXICAL_WEIGHT / (k + rank + 1)
+                if product_id in products:
+                    continue
+                allowed = lexical_only.get(product_id, [])
+                if allowed is None or not categories:
+                    lexical_only[product_id] = None
+                else:
+                    lexical_only[product_id] = allowed + list(categories)
+
+        if lexical_only:
+            vectors = np.asarray(query_vectors, dtype=np.float32)
+            for product_id, stored in self.get_products(list(lexical_only)).items():
+                allowed = lexical_only[product_id]
+                if allowed is not None and not self._matches_categories(stored['metadata'], allowed):
+                    continue
+                # Squared L2, the collection's distance function
+                distances = np.sum((vectors - np.asarray(stored['embedding'], dtype=np.float32)) ** 2, axis=1)
+                products[product_id] = self._format_result(product_id, float(distances.min()), stored['metadata'])
+
+        ranked = sorted(products.values(), key=lambda product: fused[product['id']], reverse=True)
+        ranked = ranked[:Config.SEARCH_RESULTS_LIMIT * max(len(dense_lists), 1)]
+        for product in ranked:
+            product['fusion_score'] = round(fused[product['id']], 6)
+        return ranked
+
+    def _filter_results(self, ids, scores, metadatas, conversation_history):
+        """Keep results within the relative distance threshold of a single query."""
+        products = []
+        min_score = min(scores)
+        max_score = max(scores)
+        
+        threshold_multiplier = (Config.SEARCH_THRESHOLD_MULTIPLIER['FOLLOW_UP'] 
+                            if len(conversation_history) > 0 
+                            else Config.SEARCH_THRESHOLD_MULTIPLIER['NEW_QUERY'])
+        threshold = min_score + (max_score - min_score) * threshold_multiplier
+
+        print(f"📝 Threshold: {threshold}")
+
+        for i in range(len(ids)):
+            score = scores[i]
+            if score > threshold:
+                continue
+            products.append(self._format_result(ids[i], score, metadatas[i]))
+
+        return products
+
+    @staticmethod
+    def _format_result(product_id, score, metadata):
+        """Shape a stored product as a search result."""
+        return {
+            'id': product_id,
+            'score': score,
+            'metadata': {
+                'name_clean': metadata['name'],
+                'description_clean': metadata['description'],
+                'tags_clean': metadata.get('tags', ''),
+                'product_type': metadata.get('product_type', ''),
+                'url': metadata.get('url', '')
+            }
+        }
+
     def get_product(self, product_id):
         """Get a product from the vector database by ID."""
         try:
@@ -98,30 +549,98 @@ class ChromaHandler:
             print(f"❌ Error fetching product from vector database: {str(e)}")
             return None
 
+    def get_products(self, product_ids):
+        """Get several products from the vector database in one call.
+
+        Returns:
+            dict: Product ID to {'metadata', 'embedding'} for the IDs that are indexed
+        """
+        if not product_ids:
+            return {}
+        try:
+            result = self.collection.get(
+                ids=[str(pid) for pid in product_ids],
+                include=['metadatas', 'embeddings']
+            )
+            return {
+                product_id: {'metadata': metadata, 'embedding': embedding}
+                for product_id, metadata, embedding in zip(
+                    result['ids'], result['metadatas'], result['embeddings']
+                )
+            }
+        except Exception as e:
+            print(f"❌ Error fetching products from vector database: {str(e)}")
+            return {}
+
     def get_all_embeddings(self):
         """Get all embeddings with metadata."""
         try:
             results = self.collection.get(
-                include=['embeddings', 'metadatas', 'ids']
+                include=['embeddings', 'metadatas']
             )
             return results
         except Exception as e:
             print(f"❌ Error getting all embeddings: {str(e)}")
             return None
 
+    def get_sample(self, limit):
+        """Get up to limit stored products with their embeddings and metadata."""
+        return self.collection.get(limit=limit, include=['embeddings', 'metadatas'])
+
+    def get_content_hashes(self):
+        """Get a mapping of indexed product IDs to their stored content hash."""
+        results = self.collection.get(include=['metadatas'])
+        return {
+            product_id: (metadata or {}).get('content_hash')
+            for product_id, metadata in zip(results['ids'], results['metadatas'])
+        }
+
     def count_indexed_products(self):
         """Count the number of products in the vector database."""
         try:
-            return len(self.collection.get()['ids'])
+            return self._cached_stat('count', self.collection.count)
         except Exception as e:
             print(f"❌ Error counting indexed products: {str(e)}")
             return 0
 
+    def count_by_product_type(self):
+        """Count indexed products per category, cached until the index changes.
+
+        Counts come from the type_* flags and fetch IDs only, not metadata.
+        A product in several categories counts towards each; 'other' holds
+        products without any category.
+        """
+        def compute():
+            collection = self.collection
+            counts = {}
+            for category in Config.PRODUCT_TYPES:
+                ids = collection.get(where={f"type_{category}": True}, include=[])['ids']
+                if ids:
+                    counts[category] = len(ids)
+            categorized = collection.get(where=self._category_where(Config.PRODUCT_TYPES), include=[])['ids']
+            other = collection.count() - len(categorized)
+            if other:
+                counts['other'] = other
+            return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+        try:
+            return self._cached_stat('by_product_type', compute)
+        except Exception as e:
+            print(f"❌ Error counting products by type: {str(e)}")
+            return {}
+
     def cleanup_index(self):
         """Remove all entries from the vector database."""
         try:
-            self.client.delete_collection(Config.CHROMA_COLLECTION_NAME)
-            self.collection = self.client.create_collection(Config.CHROMA_COLLECTION_NAME)
+            with self._swap_lock:
+                self.client.delete_collection(self.collection_name)
+                self.collection = self.client.create_collection(self.collection_name)
+                # Rewrite the pointer so other processes pick up the recreated collection
+                self._write_active_collection_name(self.collection_name)
+            lexical_index = self.get_lexical_index()
+            lexical_index.clear()
+            lexical_index.save()
+            self._invalidate_stats()
             print("✅ Vector database cleaned up successfully")
             return True
         except Exception as e:
@@ -132,6 +651,10 @@ class ChromaHandler:
         """Remove a single product from the vector database."""
         try:
             self.collection.delete(ids=[str(product_id)])
+            lexical_index = self.get_lexical_index()
+            lexical_index.remove_documents([product_id])
+            lexical_index.save()
+            self._invalidate_stats()
             print(f"✅ Product {product_id} removed from vector database")
             return True
         except Exception as e:
@@ -142,6 +665,10 @@ class ChromaHandler:
         """Remove multiple products from the vector database."""
         try:
             self.collection.delete(ids=[str(pid) for pid in product_ids])
+            lexical_index = self.get_lexical_index()
+            lexical_index.remove_documents(product_ids)
+            lexical_index.save()
+            self._invalidate_stats()
             print(f"✅ {len(product_ids)} products removed from vector database")
             return True
         except Exception as e:
@@ -0,0 +1,38 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from src.config.config import Config
+from src.handlers.data_processor import prepare_product_text
+
+class CleaningPool:
+    """Worker processes that clean product text during indexing.
+
+    Workers are spawned rather than forked because the indexing process runs
+    threads and holds the embedding model. A spawned worker only imports this
+    module and data_processor (plus the launching script's unguarded top
+    level), so the app and its database handles are never set up in workers.
+    """
+
+    def __init__(self, workers=None):
+        """Initialize the pool; processes are started on first use."""
+        self.workers = workers or Config.CLEANING_WORKERS
+        self._executor = None
+
+    def map(self, products):
+        """Clean products across the workers.
+
+        Returns:
+            list: (original_data, processed_data) per product, in input order
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        chunksize = max(1, len(products) // (self.workers * 4))
+        return list(self._executor.map(prepare_product_text, products, chunksize=chunksize))
+
+    def shutdown(self):
+        """Stop the worker processes; the next map() starts new ones."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
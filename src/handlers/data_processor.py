@@ -1,10 +1,65 @@
 from bs4 import BeautifulSoup
+import html
+from html.entities import html5 as HTML5_ENTITIES
 import re
-from config.config import Config
+from src.config.config import Config
+from src.handlers.keyword_matcher import product_type_matcher
+
+# Markup the fast stripper knows how to remove; anything else goes through BeautifulSoup
+_HTML_MARKUP = re.compile(r'<!--.*?-->|</?[a-zA-Z](?:[^<>"\']|"[^"]*"|\'[^\']*\')*>', re.DOTALL)
+_HTML_ENTITY = re.compile(r'&(?:#([0-9]+)|#[xX]([0-9a-fA-F]+)|([a-zA-Z][a-zA-Z0-9]*));')
+_UNSUPPORTED_MARKUP = re.compile(
+    r'<!\[CDATA\[|<\?|<!(?!--)|<(?:script|style|textarea|title|pre)\b', re.IGNORECASE
+)
+_ASCII_WHITESPACE = ' \n\t\x0c\r'
+
+def clean_html_bs4(text):
+    """Remove HTML tags from text using a full BeautifulSoup parse."""
+    return BeautifulSoup(text, 'html.parser').get_text()
+
+def _has_only_plain_entities(text):
+    """Check every '&' starts a known, ';'-terminated entity that html.unescape decodes like html.parser."""
+    entities = _HTML_ENTITY.findall(text)
+    if len(entities) != text.count('&'):
+        return False
+    for decimal, hexadecimal, name in entities:
+        if name and f"{name};" not in HTML5_ENTITIES:
+            return False
+        if (decimal or hexadecimal) and int(decimal or hexadecimal, 10 if decimal else 16) == 0:
+            return False
+    return True
+
+def clean_html_fast(text):
+    """Remove HTML tags with regular expressions, matching BeautifulSoup's get_text().
+
+    Like html.parser, whitespace-only text between tags collapses to a single
+    space or newline. Input the regexes don't model (CDATA, doctype, raw-text
+    or whitespace-preserving elements, stray '<', entities without a closing
+    ';' or unknown names) falls back to BeautifulSoup.
+    """
+    if '<' not in text and '&' not in text and text.strip(_ASCII_WHITESPACE):
+        return text
+    if _UNSUPPORTED_MARKUP.search(text) or ('&' in text and not _has_only_plain_entities(text)):
+        return clean_html_bs4(text)
+
+    parts = []
+    for segment in _HTML_MARKUP.split(text):
+        if not segment:
+            continue
+        if '<' in segment:
+            # A '<' that didn't form a tag; let the real parser decide
+            return clean_html_bs4(text)
+        segment = html.unescape(segment)
+        if not segment.strip(_ASCII_WHITESPACE):
+            segment = '\n' if '\n' in segment else ' '
+        parts.append(segment)
+    return ''.join(parts)
 
 def clean_html(text):
     """Remove HTML tags from text."""
-    return BeautifulSoup(text, 'html.parser').get_text()
+    if Config.HTML_CLEANER == 'bs4':
+        return clean_html_bs4(text)
+    return clean_html_fast(text)
 
 def clean_url_string(text):
     """Clean text for use in URLs."""
@@ -26,8 +81,7 @@ def clean_and_enhance_text(text, is_tags=False):
         # Repeat important category tags to increase their weight
         enhanced_tags = []
         for tag in tags:
-            tag_lower = tag.lower()
-            if any(key in tag_lower for key in ['garage', 'window', 'door', 'gate']):
+            if product_type_matcher.contains_any(tag):
                 enhanced_tags.extend([tag] * 3)  # Repeat important tags
             else:
                 enhanced_tags.append(tag)
@@ -36,12 +90,44 @@ def clean_and_enhance_text(text, is_tags=False):
 
 def extract_product_type(name, tags):
     """Extract product type/category from name and tags."""
-    combined_text = (name + " " + tags).lower()
-    detected_types = []
-    
-    for category, keywords in Config.PRODUCT_TYPES.items():
-        if any(keyword in combined_text for keyword in keywords):
-            detected_types.append(category)
-    
+    detected_types = product_type_matcher.find_labels_in_table_order(name + " " + tags)
     return " ".join(detected_types) if detected_types else "other"
 
+def prepare_product_text(product):
+    """Clean a raw MySQL product row in a single pass.
+
+    Module-level so it can be sent to worker processes during indexing.
+
+    Returns:
+        tuple: (original_data, processed_data)
+    """
+    # Extract original fields
+    name = product.get("name_en") or ""
+    description = " ".join([
+        product.get("descr_en") or "",
+        product.get("descr2_en") or ""
+    ])
+    tags = product.get("tags_en") or ""
+
+    # Clean and process text
+    name_clean = clean_and_enhance_text(name)
+    description_clean = clean_and_enhance_text(description)
+    tags_clean = clean_and_enhance_text(tags, is_tags=True)
+
+    # Extract product type
+    product_type = extract_product_type(name_clean, tags_clean)
+
+    original_data = {
+        'name': name,
+        'description': description,
+        'tags': tags
+    }
+
+    processed_data = {
+        'name_clean': name_clean,
+        'product_type': product_type,
+        'description_clean': description_clean,
+        'tags_clean': tags_clean
+    }
+
+    return original_data, processed_data
@@ -0,0 +1,79 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+class EmbeddingCache:
+    """Content-addressed cache of text embeddings keyed by model name and normalized text.
+
+    Unbounded by default; with max_entries it evicts the least recently used vectors.
+    """
+
+    def __init__(self, max_entries=None):
+        """Initialize an empty cache with zeroed counters."""
+        self.max_entries = max_entries
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_text(text):
+        """Collapse whitespace so trivially different strings share one entry."""
+        return re.sub(r'\s+', ' ', text).strip()
+
+    @staticmethod
+    def make_key(model_name, text):
+        """Build the cache key for a model and an already normalized text."""
+        return hashlib.sha1(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """Look up keys, counting repeats of a pending key as hits.
+
+        Returns:
+            tuple: (found, missing) where found maps cached keys to vectors and
+            missing lists the distinct keys that still need encoding, in order
+        """
+        found = {}
+        missing = []
+        pending = set()
+        with self._lock:
+            for key in keys:
+                if key in self._vectors:
+                    found[key] = self._vectors[key]
+                    self._vectors.move_to_end(key)
+                    self.hits += 1
+                elif key in pending:
+                    self.hits += 1
+                else:
+                    pending.add(key)
+                    missing.append(key)
+                    self.misses += 1
+        return found, missing
+
+    def put(self, key, vector):
+        """Store a vector under the given key."""
+        with self._lock:
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)
+            if self.max_entries is not None:
+                while len(self._vectors) > self.max_entries:
+                    self._vectors.popitem(last=False)
+
+    def reset(self):
+        """Drop all cached vectors and zero the counters."""
+        with self._lock:
+            self._vectors.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        """Get hit/miss counters and the number of distinct cached strings."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._vectors),
+            'max_entries': self.max_entries,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
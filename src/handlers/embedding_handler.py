@@ -1,15 +1,27 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from src.config.config import Config
 from src.handlers.data_processor import clean_and_enhance_text, extract_product_type
+from src.handlers.model_registry import model_registry
+from src.handlers.embedding_cache import EmbeddingCache
 
 class EmbeddingHandler:
     """Handler for text embedding operations."""
     
     def __init__(self):
-        """Initialize the embedding model."""
-        self.model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        """Initialize the embedding handler."""
+        self.model_name = Config.EMBEDDING_MODEL
+        self.backend = Config.EMBEDDING_BACKEND
         self.weights = Config.VECTOR_WEIGHTS
+        # Shared strings such as product types and tag lists are encoded once per indexing run
+        self.cache = EmbeddingCache()
+        # Chat queries repeat the same short category strings; keep their vectors across turns
+        self.query_cache = EmbeddingCache(max_entries=Config.QUERY_CACHE_MAX_ENTRIES)
+        self._query_cache_model = None
+
+    @property
+    def model(self):
+        """Shared embedding model, loaded lazily by the model registry."""
+        return model_registry.get_model(self.model_name, self.backend)
 
     def encode_query(self, query):
         """Encode a query into a vector."""
@@ -26,34 +38,78 @@ class EmbeddingHandler:
                 
             print(f"📝 Cleaned query: {clean_query}")
             
-            # Generate embedding for the cleaned query
-            embedding = self.model.encode(clean_query)
-            if not isinstance(embedding, np.ndarray):
-                print(f"❌ Expected numpy array from model, got {type(embedding)}")
-                return None
-                
-            # Ensure we have a 1D array
-            if len(embedding.shape) == 1:
-                embedding = embedding.reshape(1, -1)
-            
-            # Normalize the embedding
-            normalized_embedding = embedding / np.linalg.norm(embedding, axis=1, keepdims=True)
-            
-            # Convert to list and ensure it's in the correct format
-            return normalized_embedding[0].tolist()
+            # Cached vectors are already normalized
+            return self._encode_clean_queries([clean_query])[0].tolist()
         except Exception as e:
             print(f"❌ Error encoding query: {str(e)}")
             print(f"Query: {query}")
             print(f"Clean query: {clean_query if 'clean_query' in locals() else 'not cleaned yet'}")
             return None
 
-    def create_product_embedding(self, name, description, tags, product_type):
-        """Create a weighted embedding for a product."""
+    def encode_queries(self, queries):
+        """Encode several queries in one batched call.
+
+        Returns:
+            list: A normalized vector (as a list) per query, or None for queries
+            that are empty after cleaning
+        """
+        try:
+            clean_queries = [
+                clean_and_enhance_text(q) if isinstance(q, str) else ""
+                for q in queries
+            ]
+            to_encode = [q for q in clean_queries if q]
+            if not to_encode:
+                print("❌ All queries are empty after cleaning")
+                return [None] * len(queries)
+
+            print(f"📝 Cleaned queries: {to_encode}")
+            vectors = iter(self._encode_clean_queries(to_encode))
+            return [next(vectors).tolist() if q else None for q in clean_queries]
+        except Exception as e:
+            print(f"❌ Error encoding queries: {str(e)}")
+            print(f"Queries: {queries}")
+            return [None] * len(queries)
+
+    def _encode_clean_queries(self, clean_queries):
+        """Return a normalized vector per cleaned query, using the query cache.
+
+        Only queries missing from the cache go through the model, in one batch.
+        The cache is flushed whenever the registry hands out a different model.
+        """
+        model = self.model
+        if model is not self._query_cache_model:
+            self.query_cache.reset()
+            self._query_cache_model = model
+
+        normalized = [EmbeddingCache.normalize_text(q) for q in clean_queries]
+        keys = [EmbeddingCache.make_key(f"{self.model_name}:{self.backend}", q) for q in normalized]
+        found, missing = self.query_cache.get_many(keys)
+
+        if missing:
+            key_to_text = dict(zip(keys, normalized))
+            encoded = self._encode_texts([key_to_text[key] for key in missing]).astype(np.float32)
+            encoded = encoded / np.linalg.norm(encoded, axis=1, keepdims=True)
+            for key, vector in zip(missing, encoded):
+                self.query_cache.put(key, vector)
+                found[key] = vector
+
+        return [found[key] for key in keys]
+
+    def create_product_embedding(self, name, description, tags, product_type, already_clean=False):
+        """Create a weighted embedding for a product.
+
+        Pass already_clean=True when the texts come from prepare_product_text,
+        to skip cleaning them a second time.
+        """
         try:
             # Clean and enhance the input texts
-            clean_name = clean_and_enhance_text(name)
-            clean_descr = clean_and_enhance_text(description)
-            clean_tags = clean_and_enhance_text(tags)
+            if already_clean:
+                clean_name, clean_descr, clean_tags = name, description, tags
+            else:
+                clean_name = clean_and_enhance_text(name)
+                clean_descr = clean_and_enhance_text(description)
+                clean_tags = clean_and_enhance_text(tags)
             product_type = extract_product_type(clean_name, clean_descr)
 
             # Generate embeddings with enhanced text
@@ -84,5 +140,85 @@ class EmbeddingHandler:
             print(f"❌ Error creating product embedding: {str(e)}")
             return None
 
+    def create_product_embeddings_batch(self, products):
+        """Create weighted embeddings for a chunk of products in batched encode calls.
+
+        Args:
+            products (list): Dicts with already cleaned 'name', 'description',
+                'tags' and 'product_type' keys (see prepare_product_text)
+
+        Returns:
+            list: Embedding results in the same format as create_product_embedding
+        """
+        if not products:
+            return []
+
+        clean_names = [p['name'] for p in products]
+        clean_descrs = [p['description'] for p in products]
+        clean_tags = [p['tags'] for p in products]
+        product_types = [
+            extract_product_type(name, descr)
+            for name, descr in zip(clean_names, clean_descrs)
+        ]
+
+        # One batched encode call per field instead of four calls per product
+        embedding_names = self._encode_batch(clean_names)
+        embedding_descrs = self._encode_batch(clean_descrs)
+        embedding_tags = self._encode_batch(clean_tags, use_cache=True)
+        embedding_categories = self._encode_batch(product_types, use_cache=True)
+
+        # Combine vectors with adjusted weights across the whole chunk
+        final_embeddings = (
+            self.weights['NAME'] * embedding_names +
+            self.weights['DESCRIPTION'] * embedding_descrs +
+            self.weights['TAGS'] * embedding_tags +
+            self.weights['CATEGORY'] * embedding_categories
+        )
+
+        # Normalize every row of the combined matrix
+        final_embeddings = final_embeddings / np.linalg.norm(final_embeddings, axis=1, keepdims=True)
+
+        return [
+            {
+                'embedding': final_embeddings[i].tolist(),
+                'name_clean': clean_names[i],
+                'description_clean': clean_descrs[i],
+                'tags_clean': clean_tags[i],
+                'product_type': product_types[i]
+            }
+            for i in range(len(products))
+        ]
+
+    def _encode_batch(self, texts, use_cache=False):
+        """Encode a list of texts into a 2D array using batched inference.
+
+        With use_cache, each distinct normalized text is encoded at most once
+        and reused from the embedding cache afterwards.
+        """
+        if not use_cache:
+            return self._encode_texts(texts)
+
+        normalized = [EmbeddingCache.normalize_text(text) for text in texts]
+        keys = [EmbeddingCache.make_key(f"{self.model_name}:{self.backend}", text) for text in normalized]
+        found, missing = self.cache.get_many(keys)
+
+        if missing:
+            key_to_text = dict(zip(keys, normalized))
+            encoded = self._encode_texts([key_to_text[key] for key in missing])
+            for key, vector in zip(missing, encoded):
+                self.cache.put(key, vector)
+                found[key] = vector
+
+        return np.stack([found[key] for key in keys])
+
+    def _encode_texts(self, texts):
+        """Run the model over a list of texts in batches."""
+        return np.asarray(self.model.encode(
+            texts,
+            batch_size=Config.EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ))
+
 # Create a singleton instance
 embeddings = EmbeddingHandler() 
\ No newline at end of file
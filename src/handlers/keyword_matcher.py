@@ -0,0 +1,87 @@
+import re
+from src.config.config import Config
+
+_WORD = re.compile(r'\w+')
+
+class KeywordMatcher:
+    """Word-boundary keyword matcher compiled once from a {label: [keywords]} table.
+
+    Keywords are stored as tuples of lowercase words in a dict, so matching
+    costs one lookup per word window of the text regardless of how many
+    keywords there are. By default every keyword occurrence is reported,
+    including overlapping ones ('garage door' yields both 'garage' and
+    'door'); with longest=True only the longest keyword at each position
+    counts and matches don't overlap ('garage door' yields only 'garage').
+    The last word of a keyword may carry a plural 's'/'es' suffix.
+    """
+
+    def __init__(self, keyword_table):
+        """Compile the keyword table."""
+        self._labels_by_keyword = {}
+        self._label_order = {}
+        for label, keywords in keyword_table.items():
+            self._label_order.setdefault(label, len(self._label_order))
+            for keyword in keywords:
+                words = tuple(_WORD.findall(keyword.lower()))
+                if not words:
+                    continue
+                labels = self._labels_by_keyword.setdefault(words, [])
+                if label not in labels:
+                    labels.append(label)
+        self._max_words = max((len(words) for words in self._labels_by_keyword), default=0)
+
+    @staticmethod
+    def _singular_forms(word):
+        """Return the word plus the forms it could have before a plural suffix."""
+        forms = [word]
+        if word.endswith('es'):
+            forms.append(word[:-2])
+        if word.endswith('s'):
+            forms.append(word[:-1])
+        return forms
+
+    def _labels_at(self, words, start, end):
+        """Return labels of the keyword spanning words[start:end], if any."""
+        head = tuple(words[start:end - 1])
+        labels = []
+        for last in self._singular_forms(words[end - 1]):
+            for label in self._labels_by_keyword.get(head + (last,), ()):
+                if label not in labels:
+                    labels.append(label)
+        return labels
+
+    def find_labels(self, text, longest=False):
+        """Return labels of keywords found in text, in order of first appearance.
+
+        Args:
+            longest (bool): Match only the longest keyword at each position and
+                continue after it, so a phrase like 'garage doors' is not also
+                reported as 'doors'
+        """
+        words = _WORD.findall(text.lower())
+        found = []
+        start = 0
+        while start < len(words):
+            next_start = start + 1
+            for end in range(min(start + self._max_words, len(words)), start, -1):
+                labels = self._labels_at(words, start, end)
+                for label in labels:
+                    if label not in found:
+                        found.append(label)
+                if labels and longest:
+                    next_start = end
+                    break
+            start = next_start
+        return found
+
+    def find_labels_in_table_order(self, text, longest=False):
+        """Return labels found in text, ordered as in the keyword table."""
+        return sorted(self.find_labels(text, longest), key=self._label_order.__getitem__)
+
+    def contains_any(self, text):
+        """Return True if any keyword occurs in text."""
+        return bool(self.find_labels(text))
+
+# Shared matcher for product categories: indexing and tag boosting use every match,
+# query analysis the longest non-overlapping ones
+product_type_matcher = KeywordMatcher(Config.PRODUCT_TYPES)
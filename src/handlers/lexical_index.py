@@ -0,0 +1,164 @@
+import json
+import math
+import os
+import re
+import threading
+
+# Words plus joined forms such as SKUs ('ab-120', 'v2.1'), which are also split into their parts
+_TOKEN = re.compile(r'\w+(?:[-./]\w+)*')
+_PART = re.compile(r'\w+')
+
+def _fold_plural(term):
+    """Drop a plural 's' from plain words so 'doors' matches 'door'; codes are kept as-is."""
+    if len(term) > 3 and term.isalpha() and term.endswith('s') and not term.endswith('ss'):
+        return term[:-1]
+    return term
+
+def tokenize(text):
+    """Split text into lowercase search terms."""
+    terms = []
+    for token in _TOKEN.findall((text or '').lower()):
+        terms.append(_fold_plural(token))
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.extend(_fold_plural(part) for part in parts)
+    return terms
+
+class LexicalIndex:
+    """Incremental BM25 inverted index over product name, tags and description.
+
+    Documents are kept as per-product term frequencies so they can be replaced
+    or removed, and the postings are rebuilt from them on load. Field weights
+    repeat name and tag terms so exact product names and tags dominate.
+    """
+
+    FIELD_WEIGHTS = {'name_clean': 3, 'tags_clean': 2, 'description_clean': 1}
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, path):
+        """Initialize an empty index persisted at path."""
+        self.path = path
+        self._documents = {}
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _term_frequencies(self, fields):
+        """Count weighted term frequencies over the indexed fields."""
+        frequencies = {}
+        for field, weight in self.FIELD_WEIGHTS.items():
+            for term in tokenize(fields.get(field, '')):
+                frequencies[term] = frequencies.get(term, 0) + weight
+        return frequencies
+
+    def _remove_locked(self, doc_id):
+        frequencies = self._documents.pop(doc_id, None)
+        if frequencies is None:
+            return
+        for term in frequencies:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def _add_locked(self, doc_id, frequencies):
+        self._remove_locked(doc_id)
+        self._documents[doc_id] = frequencies
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        self._lengths[doc_id] = sum(frequencies.values())
+        self._total_length += self._lengths[doc_id]
+
+    def add_documents(self, doc_ids, documents):
+        """Add or replace documents given as dicts with the cleaned text fields."""
+        with self._lock:
+            for doc_id, fields in zip(doc_ids, documents):
+                self._add_locked(str(doc_id), self._term_frequencies(fields))
+            self.dirty = True
+
+    def remove_documents(self, doc_ids):
+        """Remove documents by ID; unknown IDs are ignored."""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove_locked(str(doc_id))
+            self.dirty = True
+
+    def clear(self):
+        """Remove every document."""
+        with self._lock:
+            self._documents.clear()
+            self._postings.clear()
+            self._lengths.clear()
+            self._total_length = 0
+            self.dirty = True
+
+    def search(self, query, limit=10):
+        """Rank documents for a query with BM25.
+
+        Returns:
+            list: (doc_id, score) tuples, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._documents)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count
+
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length = self._lengths[doc_id]
+                    norm = frequency + self.K1 * (1 - self.B + self.B * length / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.K1 + 1) / norm
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def load(self):
+        """Load the index from disk; return False if there is no saved index."""
+        try:
+            with open(self.path) as f:
+                documents = json.load(f)['documents']
+        except (OSError, ValueError, KeyError):
+            return False
+
+        with self._lock:
+            self._documents.clear()
+            self._postings.clear()
+            self._lengths.clear()
+            self._total_length = 0
+            for doc_id, frequencies in documents.items():
+                self._add_locked(doc_id, frequencies)
+            self.dirty = False
+        return True
+
+    def save(self):
+        """Persist the index atomically if it changed since the last save."""
+        with self._lock:
+            if not self.dirty:
+                return
+            payload = {'version': 1, 'documents': self._documents}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def delete(self):
+        """Remove the persisted index file."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
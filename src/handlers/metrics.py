@@ -0,0 +1,231 @@
+import contextvars
+import resource
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from src.config.config import Config
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+class RequestTrace:
+    """Timing spans and LLM usage collected while answering one chat request."""
+
+    def __init__(self):
+        """Start an empty trace."""
+        self.spans = []
+        self.llm = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that span() and record_llm_usage() report into."""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    def add_span(self, name, seconds):
+        """Record a finished stage."""
+        self.spans.append({'name': name, 'ms': round(seconds * 1000, 1)})
+
+    def to_dict(self):
+        """Summarize the trace for debug_info."""
+        return {
+            'spans': self.spans,
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 1),
+            'llm': self.llm
+        }
+
+class ChatMetrics:
+    """Rolling latency percentiles per pipeline stage plus LLM token throughput.
+
+    Each stage keeps its last METRICS_WINDOW_SIZE samples, so percentiles
+    reflect recent traffic rather than everything since startup.
+    """
+
+    def __init__(self, window_size=None):
+        """Initialize empty sample windows."""
+        self.window_size = window_size or Config.METRICS_WINDOW_SIZE
+        self._samples = {}
+        self._counts = {}
+        self._llm = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """Add a latency sample for a stage."""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window_size)
+            samples.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    def record_llm(self, call, usage):
+        """Add token counts and throughput for one LLM call."""
+        with self._lock:
+            window = self._llm.get(call)
+            if window is None:
+                window = self._llm[call] = deque(maxlen=self.window_size)
+            window.append(usage)
+
+    @staticmethod
+    def _percentiles(values, scale=1.0):
+        """Summarize samples as count, mean and p50/p95/p99."""
+        array = np.asarray(values, dtype=np.float64) * scale
+        p50, p95, p99 = np.percentile(array, [50, 95, 99])
+        return {
+            'mean': round(float(array.mean()), 1),
+            'p50': round(float(p50), 1),
+            'p95': round(float(p95), 1),
+            'p99': round(float(p99), 1),
+            'max': round(float(array.max()), 1)
+        }
+
+    def get_stats(self):
+        """Get latency percentiles (ms) per stage and token stats per LLM call."""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+            llm = {call: list(values) for call, values in self._llm.items()}
+
+        stages = {
+            stage: {'count': counts[stage], **self._percentiles(values, 1000)}
+            for stage, values in samples.items()
+        }
+        llm_stats = {}
+        for call, usages in llm.items():
+            llm_stats[call] = {
+                'calls': len(usages),
+                'prompt_tokens': self._percentiles([u['prompt_tokens'] for u in usages]),
+                'completion_tokens': self._percentiles([u['completion_tokens'] for u in usages]),
+                'tokens_per_second': self._percentiles([u['tokens_per_second'] for u in usages]),
+                'prompt_tokens_per_second': self._percentiles([u['prompt_tokens_per_second'] for u in usages])
+            }
+        return {'window_size': self.window_size, 'stages': stages, 'llm': llm_stats}
+
+    def reset(self):
+        """Drop all samples."""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._llm.clear()
+
+class IndexingProfiler:
+    """Cumulative time and throughput per indexing stage, with a rolling ETA.
+
+    Stages are timed as the job runs (e.g. fetch, clean, embed, write); the
+    ETA uses the throughput of the last INDEXING_ETA_WINDOW chunks so it
+    follows the current pace rather than the average since the start.
+    """
+
+    def __init__(self, total=0, window_size=None):
+        """Start profiling a run over total products."""
+        self.total = total
+        self._stages = {}
+        self._chunks = deque(maxlen=window_size or Config.INDEXING_ETA_WINDOW)
+        self._start = time.perf_counter()
+        self._rss_start = get_peak_rss_mb()
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """Time one pass through a stage that handled items products."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, items)
+
+    def add(self, name, seconds, items=0):
+        """Record a finished pass through a stage."""
+        stage = self._stages.setdefault(name, {'seconds': 0.0, 'items': 0, 'calls': 0})
+        stage['seconds'] += seconds
+        stage['items'] += items
+        stage['calls'] += 1
+
+    def chunk_done(self, items, seconds):
+        """Record the wall time of a whole chunk for the rolling ETA."""
+        self._chunks.append((items, seconds))
+
+    def items_per_second(self):
+        """Throughput over the recent chunks."""
+        seconds = sum(s for _, s in self._chunks)
+        return sum(i for i, _ in self._chunks) / seconds if seconds else 0.0
+
+    def eta_seconds(self, processed):
+        """Estimated seconds until the remaining products are indexed."""
+        rate = self.items_per_second()
+        if not rate:
+            return None
+        return round(max(self.total - processed, 0) / rate, 1)
+
+    def to_dict(self, processed):
+        """Summarize stage timings, throughput, ETA and memory."""
+        stages = {}
+        staged_seconds = sum(stage['seconds'] for stage in self._stages.values())
+        for name, stage in self._stages.items():
+            stages[name] = {
+                'seconds': round(stage['seconds'], 2),
+                'items': stage['items'],
+                'calls': stage['calls'],
+                'items_per_second': round(stage['items'] / stage['seconds'], 1) if stage['seconds'] else None,
+                'share': round(stage['seconds'] / staged_seconds, 3) if staged_seconds else 0.0
+            }
+        peak_rss = get_peak_rss_mb()
+        return {
+            'elapsed_seconds': round(time.perf_counter() - self._start, 1),
+            'stages': stages,
+            'bottleneck': max(stages, key=lambda name: stages[name]['seconds']) if stages else None,
+            'items_per_second': round(self.items_per_second(), 1),
+            'eta_seconds': self.eta_seconds(processed),
+            'peak_rss_mb': round(peak_rss, 1),
+            'rss_increase_mb': round(peak_rss - self._rss_start, 1)
+        }
+
+def get_peak_rss_mb():
+    """Return the peak resident set size of this process in megabytes."""
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@contextmanager
+def span(name):
+    """Time a stage into the global histograms and the active request trace, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        chat_metrics.record(name, elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, elapsed)
+
+def record_llm_usage(call, response):
+    """Record token counts and speed reported by Ollama for a finished call.
+
+    Args:
+        call (str): Name of the LLM call, e.g. 'extract' or 'generate'
+        response (dict): The final Ollama response (or last streamed chunk)
+    """
+    def per_second(count, duration_ns):
+        return round(count / (duration_ns / 1e9), 1) if duration_ns else 0.0
+
+    prompt_tokens = response.get('prompt_eval_count') or 0
+    completion_tokens = response.get('eval_count') or 0
+    usage = {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'tokens_per_second': per_second(completion_tokens, response.get('eval_duration')),
+        'prompt_tokens_per_second': per_second(prompt_tokens, response.get('prompt_eval_duration')),
+        'load_ms': round((response.get('load_duration') or 0) / 1e6, 1)
+    }
+    chat_metrics.record_llm(call, usage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.llm[call] = usage
+    return usage
+
+# Create a singleton instance
+chat_metrics = ChatMetrics()
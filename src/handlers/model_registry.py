@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from src.config.config import Config
+from src.handlers.metrics import get_peak_rss_mb
+
+class ModelRegistry:
+    """Process-wide registry of lazily loaded embedding models shared across threads."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_name=None, backend=None):
+        """Return the model for the given name and inference backend, loading it on first use."""
+        key = (model_name or Config.EMBEDDING_MODEL, backend or Config.EMBEDDING_BACKEND)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if key not in self._models:
+                self._models[key] = self._load_model(*key)
+            return self._models[key]
+
+    def _load_model(self, model_name, backend):
+        """Load a model for the given backend and record its load statistics.
+
+        Backends: 'torch' (fp32 SentenceTransformer), 'onnx' (ONNX Runtime) and
+        'onnx-int8' (dynamically quantized ONNX). ONNX backends fall back to
+        torch when onnxruntime is not installed.
+        """
+        print(f"📝 Loading embedding model: {model_name} ({backend})")
+        rss_before = get_peak_rss_mb()
+        start = time.perf_counter()
+        if backend in ('onnx', 'onnx-int8'):
+            try:
+                from src.handlers.onnx_encoder import OnnxSentenceEncoder
+                model = OnnxSentenceEncoder(model_name, quantize=backend == 'onnx-int8')
+            except ImportError:
+                print("⚠️ onnxruntime is not installed, falling back to the torch backend")
+                backend = 'torch'
+        elif backend != 'torch':
+            raise ValueError(f"Unknown embedding backend: {backend}")
+
+        if backend == 'torch':
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        load_time = time.perf_counter() - start
+
+        self._stats[f"{model_name}:{backend}"] = {
+            'model_name': model_name,
+            'backend': backend,
+            'load_time_seconds': round(load_time, 3),
+            'parameter_memory_mb': round(self._get_parameter_memory_mb(model), 1),
+            'rss_increase_mb': round(get_peak_rss_mb() - rss_before, 1),
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        print(f"✅ Loaded {model_name} in {load_time:.2f}s")
+        return model
+
+    @staticmethod
+    def _get_parameter_memory_mb(model):
+        """Return the memory held by the model parameters in megabytes."""
+        if hasattr(model, 'model_path'):
+            # ONNX Runtime keeps the weights as stored on disk
+            return os.path.getsize(model.model_path) / (1024 * 1024)
+        try:
+            return sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def is_loaded(self, model_name=None, backend=None):
+        """Check whether a model has already been loaded."""
+        return (model_name or Config.EMBEDDING_MODEL, backend or Config.EMBEDDING_BACKEND) in self._models
+
+    def get_stats(self):
+        """Get load time and memory statistics for all loaded models."""
+        return {
+            'models': list(self._stats.values()),
+            'process_peak_rss_mb': round(get_peak_rss_mb(), 1)
+        }
+
+# Create a singleton instance
+model_registry = ModelRegistry()
@@ -1,4 +1,7 @@
+import threading
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
 from src.config.config import Config
 
 class MySQLHandler:
@@ -7,10 +10,35 @@ class MySQLHandler:
     def __init__(self):
         """Initialize MySQL handler with configuration."""
         self.config = Config.MYSQL_CONFIG
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        """Create the connection pool on first use."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pooling.MySQLConnectionPool(
+                        pool_name=Config.MYSQL_POOL_NAME,
+                        pool_size=Config.MYSQL_POOL_SIZE,
+                        pool_reset_session=True,
+                        **self.config
+                    )
+        return self._pool
 
     def _get_connection(self):
-        """Create and return a new database connection."""
-        return mysql.connector.connect(**self.config)
+        """Return a database connection, borrowed from the pool when pooling is enabled.
+
+        Closing a pooled connection returns it to the pool.
+        """
+        if Config.MYSQL_POOL_SIZE <= 0:
+            return mysql.connector.connect(**self.config)
+        try:
+            return self._get_pool().get_connection()
+        except PoolError:
+            # Pool exhausted; fall back to a dedicated connection rather than failing
+            print("⚠️ MySQL connection pool exhausted, opening a dedicated connection")
+            return mysql.connector.connect(**self.config)
 
     def _execute_query(self, query, params=None, fetch=True):
         """Execute a query with proper connection handling."""
@@ -41,6 +69,46 @@ class MySQLHandler:
         print(f"🔍 Found {len(products)} active products")
         return products
 
+    def iter_active_products(self, batch_size=None):
+        """Stream active products in fixed-size batches.
+
+        Uses an unbuffered cursor so rows are read from the server as they are
+        consumed instead of loading the whole catalog into memory.
+
+        Yields:
+            list: Up to batch_size product dicts
+        """
+        batch_size = batch_size or Config.INDEXING_CHUNK_SIZE
+        query = """
+            SELECT id, name_en, descr_en, descr2_en, tags_en
+            FROM products WHERE active = '1'
+            ORDER BY id
+        """
+        connection = self._get_connection()
+        cursor = None
+        try:
+            # Slow consumers (e.g. embedding a chunk) must not make the server drop the stream
+            setup = connection.cursor()
+            setup.execute("SET SESSION net_write_timeout = %s", (Config.MYSQL_STREAM_WRITE_TIMEOUT,))
+            setup.close()
+
+            cursor = connection.cursor(dictionary=True, buffered=False)
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            try:
+                # Discard unread rows if the consumer stopped early
+                connection.consume_results()
+                if cursor is not None:
+                    cursor.close()
+            except Exception as e:
+                print(f"❌ Error closing streaming cursor: {str(e)}")
+            connection.close()
+
     def get_product_by_id(self, product_id):
         """Fetch a single product by ID."""
         query = """
@@ -59,22 +127,28 @@ class MySQLHandler:
         """
         return self._execute_query(query, (metadata, product_id), fetch=False)
 
+    def _build_filter_conditions(self, filters):
+        """Build the extra WHERE clause for the empty-field filters."""
+        if not filters or 'empty_fields' not in filters:
+            return ""
+
+        conditions = []
+        for field in filters['empty_fields']:
+            if field == 'description':
+                conditions.append("(descr_en IS NULL OR descr_en = '' OR descr2_en IS NULL OR descr2_en = '')")
+            elif field == 'name':
+                conditions.append("(name_en IS NULL OR name_en = '')")
+            elif field == 'tags':
+                conditions.append("(tags_en IS NULL OR tags_en = '')")
+
+        if not conditions:
+            return ""
+        return " AND (" + " OR ".join(conditions) + ")"
+
     def count_active_products(self, filters=None):
         """Count total number of active products with optional filtering."""
         base_query = "SELECT COUNT(*) as count FROM products WHERE active = '1'"
-        
-        if filters and 'empty_fields' in filters:
-            conditions = []
-            for field in filters['empty_fields']:
-                if field == 'description':
-                    conditions.append("(descr_en IS NULL OR descr_en = '' OR descr2_en IS NULL OR descr2_en = '')")
-                elif field == 'name':
-                    conditions.append("(name_en IS NULL OR name_en = '')")
-                elif field == 'tags':
-                    conditions.append("(tags_en IS NULL OR tags_en = '')")
-            
-            if conditions:
-                base_query += " AND (" + " OR ".join(conditions) + ")"
+        base_query += self._build_filter_conditions(filters)
 
         result = self._execute_query(base_query)
         return result[0]['count'] if result else 0
@@ -92,22 +166,35 @@ class MySQLHandler:
             FROM products 
             WHERE active = '1'
         """
-        
-        if filters and 'empty_fields' in filters:
-            conditions = []
-            for field in filters['empty_fields']:
-                if field == 'description':
-                    conditions.append("(descr_en IS NULL OR descr_en = '' OR descr2_en IS NULL OR descr2_en = '')")
-                elif field == 'name':
-                    conditions.append("(name_en IS NULL OR name_en = '')")
-                elif field == 'tags':
-                    conditions.append("(tags_en IS NULL OR tags_en = '')")
-            
-            if conditions:
-                base_query += " AND (" + " OR ".join(conditions) + ")"
-
+        base_query += self._build_filter_conditions(filters)
         base_query += " ORDER BY id DESC LIMIT %s OFFSET %s"
         return self._execute_query(base_query, (limit, offset))
 
+    def fetch_active_products_before(self, last_id, limit, filters=None):
+        """Fetch active products using keyset pagination, newest first.
+
+        Unlike OFFSET pagination this seeks straight to the position on the
+        primary key, so deep pages are as fast as the first one.
+
+        Args:
+            last_id (int): ID of the last product on the previous page, or None for the first page
+            limit (int): Number of records to return
+            filters (dict): Dictionary of filters, e.g. {'empty_fields': ['description', 'tags']}
+        """
+        base_query = """
+            SELECT id, name_en, descr_en, descr2_en, tags_en
+            FROM products 
+            WHERE active = '1'
+        """
+        params = []
+        if last_id is not None:
+            base_query += " AND id < %s"
+            params.append(last_id)
+
+        base_query += self._build_filter_conditions(filters)
+        base_query += " ORDER BY id DESC LIMIT %s"
+        params.append(limit)
+        return self._execute_query(base_query, tuple(params))
+
 # Create a singleton instance
-mysql_db = MySQLHandler() 
\ No newline at end of file
+mysql_db = MySQLHandler()
\ No newline at end of file
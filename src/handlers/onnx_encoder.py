@@ -0,0 +1,128 @@
+import os
+import numpy as np
+from src.config.config import Config
+
+class OnnxSentenceEncoder:
+    """CPU encoder that runs a SentenceTransformer's transformer through ONNX Runtime.
+
+    The transformer is exported once to ONNX (and optionally quantized to
+    dynamic int8) under Config.ONNX_MODEL_DIR. Tokenization, pooling and
+    normalization follow the original SentenceTransformer so vectors stay
+    comparable with the ones already stored in Chroma. Exposes the subset of
+    SentenceTransformer.encode used by EmbeddingHandler.
+
+    Raises:
+        ImportError: If onnxruntime is not installed
+    """
+
+    def __init__(self, model_name, quantize=False):
+        """Load (exporting on first use) the ONNX model for model_name."""
+        import onnxruntime
+        from sentence_transformers import SentenceTransformer
+
+        source = SentenceTransformer(model_name, device='cpu')
+        self.tokenizer = source.tokenizer
+        self.max_seq_length = source.max_seq_length
+        self.pooling_mode = self._get_pooling_mode(source)
+        self.normalize = any(type(module).__name__ == 'Normalize' for module in source)
+
+        self.model_path = self._export(source, model_name, quantize)
+        del source
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            self.model_path, options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @staticmethod
+    def _get_pooling_mode(source):
+        """Read the pooling strategy from the SentenceTransformer's Pooling module."""
+        for module in source:
+            if type(module).__name__ == 'Pooling':
+                if getattr(module, 'pooling_mode_cls_token', False):
+                    return 'cls'
+                if getattr(module, 'pooling_mode_max_tokens', False):
+                    return 'max'
+        return 'mean'
+
+    @staticmethod
+    def _export(source, model_name, quantize):
+        """Export the transformer to ONNX once and return the path to use."""
+        model_dir = os.path.join(Config.ONNX_MODEL_DIR, model_name.replace('/', '__'))
+        fp32_path = os.path.join(model_dir, 'model.onnx')
+        int8_path = os.path.join(model_dir, 'model.int8.onnx')
+
+        if not os.path.exists(fp32_path):
+            import torch
+
+            os.makedirs(model_dir, exist_ok=True)
+            print(f"📝 Exporting {model_name} to ONNX: {fp32_path}")
+            transformer = source[0].auto_model.eval()
+            sample = source.tokenizer(["export sample"], return_tensors='pt')
+            with torch.no_grad():
+                torch.onnx.export(
+                    transformer,
+                    (sample['input_ids'], sample['attention_mask']),
+                    fp32_path,
+                    input_names=['input_ids', 'attention_mask'],
+                    output_names=['last_hidden_state'],
+                    dynamic_axes={
+                        'input_ids': {0: 'batch', 1: 'sequence'},
+                        'attention_mask': {0: 'batch', 1: 'sequence'},
+                        'last_hidden_state': {0: 'batch', 1: 'sequence'}
+                    },
+                    opset_version=14
+                )
+
+        if not quantize:
+            return fp32_path
+
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            print(f"📝 Quantizing {model_name} to dynamic int8: {int8_path}")
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        return int8_path
+
+    def _pool(self, hidden_states, attention_mask):
+        """Pool token embeddings into one vector per text."""
+        if self.pooling_mode == 'cls':
+            return hidden_states[:, 0]
+        mask = attention_mask[..., None].astype(hidden_states.dtype)
+        if self.pooling_mode == 'max':
+            return np.where(mask > 0, hidden_states, -1e9).max(axis=1)
+        return (hidden_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        """Encode a string or list of strings like SentenceTransformer.encode."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        # Sort by length so each batch pads to a similar size
+        order = np.argsort([-len(text) for text in texts])
+        vectors = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            indices = order[start:start + batch_size]
+            tokens = self.tokenizer(
+                [texts[i] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np'
+            )
+            inputs = {
+                name: tokens[name].astype(np.int64)
+                for name in ('input_ids', 'attention_mask')
+                if name in self._input_names
+            }
+            hidden_states = self.session.run(None, inputs)[0]
+            pooled = self._pool(hidden_states, tokens['attention_mask'])
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for i, vector in zip(indices, pooled):
+                vectors[i] = vector
+
+        result = np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        return result[0] if single else result
@@ -0,0 +1,67 @@
+import numpy as np
+
+def project_pca(vectors, dims=2):
+    """Project vectors onto their top principal components.
+
+    Returns:
+        tuple: (coordinates array of shape (n, dims), explained variance ratio per component)
+    """
+    centered = vectors - vectors.mean(axis=0)
+    # Economy SVD: cost grows linearly with the number of products
+    _, singular_values, components = np.linalg.svd(centered, full_matrices=False)
+    coordinates = centered @ components[:dims].T
+
+    variance = singular_values ** 2
+    total = variance.sum()
+    explained = (variance[:dims] / total).tolist() if total else [0.0] * dims
+    return coordinates, explained
+
+def project_umap(vectors, dims=2):
+    """Project vectors with UMAP when umap-learn is installed.
+
+    Raises:
+        ImportError: If umap-learn is not available
+    """
+    import umap
+
+    # Reduce to 50 PCA components first; UMAP is much faster on fewer dimensions
+    if vectors.shape[1] > 50 and vectors.shape[0] > 50:
+        vectors, _ = project_pca(vectors, dims=50)
+
+    reducer = umap.UMAP(n_components=dims, n_neighbors=min(15, max(len(vectors) - 1, 2)), metric='cosine')
+    return reducer.fit_transform(vectors), None
+
+def reduce_dimensions(vectors, method='pca', dims=2):
+    """Reduce embedding vectors to 2-D or 3-D coordinates.
+
+    Falls back to PCA when UMAP is requested but not installed.
+
+    Returns:
+        dict: 'coordinates' (list of lists), 'method' actually used and
+        'explained_variance' (PCA only)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) == 0:
+        return {'coordinates': [], 'method': method, 'explained_variance': None}
+
+    # Both methods need at least as many points as output dimensions
+    dims = max(1, min(dims, vectors.shape[0], vectors.shape[1]))
+
+    explained = None
+    if method == 'umap' and len(vectors) > dims + 1:
+        try:
+            coordinates, explained = project_umap(vectors, dims)
+        except ImportError:
+            print("⚠️ umap-learn is not installed, falling back to PCA")
+            method = 'pca'
+    else:
+        method = 'pca'
+
+    if method == 'pca':
+        coordinates, explained = project_pca(vectors, dims)
+
+    return {
+        'coordinates': np.round(coordinates, 4).tolist(),
+        'method': method,
+        'explained_variance': explained
+    }
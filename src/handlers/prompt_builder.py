@@ -0,0 +1,109 @@
+import math
+import re
+from src.config.config import Config
+from src.handlers.lexical_index import tokenize
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def estimate_tokens(text):
+    """Approximate the LLM token count of text from its length."""
+    return math.ceil(len(text or '') / Config.PROMPT_CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text at a word boundary so it fits within max_tokens."""
+    max_chars = max_tokens * Config.PROMPT_CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1].rsplit(' ', 1)[0].rstrip(' ,;:')
+    return f"{cut}…"
+
+def summarize_description(text, max_tokens, query=''):
+    """Extractively shorten a description to max_tokens.
+
+    Sentences sharing the most terms with the query are kept first, the
+    opening sentence wins ties, and kept sentences stay in original order.
+    """
+    text = (text or '').strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sentences = [s for s in _SENTENCE_END.split(text) if s]
+    query_terms = set(tokenize(query))
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: (-len(query_terms.intersection(tokenize(sentences[i]))), i)
+    )
+
+    kept, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(sentences[i]) + 1
+        if used + cost <= max_tokens:
+            kept.add(i)
+            used += cost
+
+    if not kept:
+        return truncate_to_tokens(sentences[ranked[0]], max_tokens)
+    return " ".join(sentences[i] for i in sorted(kept))
+
+def _dedupe_words(text):
+    """Drop repeated words, e.g. the boosted category tags stored for embedding."""
+    seen, words = set(), []
+    for word in (text or '').split():
+        if word.lower() not in seen:
+            seen.add(word.lower())
+            words.append(word)
+    return " ".join(words)
+
+def format_product_block(product, max_description_tokens, query=''):
+    """Render a matched product for the prompt with a bounded description."""
+    metadata = product['metadata']
+    tags = truncate_to_tokens(_dedupe_words(metadata.get('tags_clean', '')), Config.PROMPT_TAGS_TOKENS)
+    description = summarize_description(metadata.get('description_clean', ''), max_description_tokens, query)
+    return (
+        f"- {metadata['name_clean']} ({metadata.get('product_type', '')}): {metadata.get('url', '')}\n"
+        f"  Tags: {tags}\n"
+        f"  Description: {description}"
+    )
+
+def rank_products(products):
+    """Order products best first: by fusion score when present, else by distance."""
+    if products and all('fusion_score' in product for product in products):
+        return sorted(products, key=lambda product: product['fusion_score'], reverse=True)
+    return sorted(products, key=lambda product: product['score'])
+
+def select_products(products, query, max_tokens=None):
+    """Pack the best products into the product section of the prompt.
+
+    Each product gets up to PROMPT_DESCRIPTION_TOKENS of description; when
+    that no longer fits, it is retried with PROMPT_MIN_DESCRIPTION_TOKENS,
+    and the remaining lower ranked products are left out.
+
+    Returns:
+        tuple: (product section text, included products, number of dropped products)
+    """
+    max_tokens = max_tokens or Config.PROMPT_PRODUCTS_TOKENS
+    ranked = rank_products(products)
+    blocks, included, used = [], [], 0
+
+    for position, product in enumerate(ranked):
+        block = format_product_block(product, Config.PROMPT_DESCRIPTION_TOKENS, query)
+        if used + estimate_tokens(block) > max_tokens:
+            block = format_product_block(product, Config.PROMPT_MIN_DESCRIPTION_TOKENS, query)
+        if used + estimate_tokens(block) > max_tokens and included:
+            return "\n".join(blocks), included, len(ranked) - position
+        blocks.append(block)
+        included.append(product)
+        used += estimate_tokens(block) + 1
+
+    return "\n".join(blocks), included, 0
+
+def collapse_history(mentioned_products, max_tokens=None):
+    """Collapse previously discussed products into one line, keeping the most recent."""
+    max_tokens = max_tokens or Config.PROMPT_HISTORY_TOKENS
+    prefix = "Previously discussed: "
+    kept = []
+    for name in reversed(mentioned_products):
+        if estimate_tokens(prefix + ", ".join([name] + kept)) > max_tokens:
+            break
+        kept.insert(0, name)
+    return prefix + ", ".join(kept) if kept else ""
@@ -0,0 +1,80 @@
+import threading
+import numpy as np
+from src.config.config import Config
+from src.handlers.embedding_handler import embeddings
+from src.handlers.keyword_matcher import KeywordMatcher, product_type_matcher
+
+class QueryAnalyzer:
+    """Local query analyzer that extracts product categories without an LLM call."""
+
+    def __init__(self):
+        """Initialize keyword matchers; category prototypes are embedded lazily."""
+        self.category_matcher = product_type_matcher
+        self.attribute_matcher = KeywordMatcher(Config.QUERY_ATTRIBUTES)
+        self._prototypes = None
+        self._lock = threading.Lock()
+
+    def _get_prototypes(self):
+        """Embed every category keyword once and return (labels, matrix)."""
+        if self._prototypes is None:
+            with self._lock:
+                if self._prototypes is None:
+                    labels, vectors = [], []
+                    for category, keywords in Config.PRODUCT_TYPES.items():
+                        for keyword in keywords + [Config.PRODUCT_TYPE_QUERIES.get(category, category)]:
+                            vector = embeddings.encode_query(keyword)
+                            if vector is not None:
+                                labels.append(category)
+                                vectors.append(vector)
+                    self._prototypes = (labels, np.array(vectors))
+        return self._prototypes
+
+    def _match_by_embedding(self, query):
+        """Return (category, confidence) of the closest category prototype, or (None, 0)."""
+        query_vector = embeddings.encode_query(query)
+        labels, matrix = self._get_prototypes()
+        if query_vector is None or not labels:
+            return None, 0.0
+
+        similarities = matrix @ np.asarray(query_vector)
+        best_by_category = {}
+        for label, similarity in zip(labels, similarities):
+            best_by_category[label] = max(best_by_category.get(label, -1.0), float(similarity))
+
+        ranked = sorted(best_by_category.items(), key=lambda item: item[1], reverse=True)
+        best_category, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+
+        if best_score < Config.QUERY_ANALYZER_MIN_SIMILARITY:
+            return None, best_score
+        if best_score - runner_up < Config.QUERY_ANALYZER_MIN_MARGIN:
+            return None, best_score
+        return best_category, best_score
+
+    def analyze(self, query):
+        """Extract query components locally.
+
+        Returns:
+            dict: Same keys as extract_query_components_llm plus 'categories',
+            'source' and 'confidence', or None when the LLM should be used instead.
+        """
+        categories = self.category_matcher.find_labels(query, longest=True)
+        source, confidence = 'keyword', 1.0
+
+        if not categories:
+            category, confidence = self._match_by_embedding(query)
+            if category is None:
+                return None
+            categories, source = [category], 'embedding'
+
+        return {
+            "products": [Config.PRODUCT_TYPE_QUERIES.get(c, c) for c in categories],
+            "categories": categories,
+            "attributes": self.attribute_matcher.find_labels(query),
+            "special_requirements": [],
+            "source": source,
+            "confidence": round(confidence, 3)
+        }
+
+# Create a singleton instance
+query_analyzer = QueryAnalyzer()
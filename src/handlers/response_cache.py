@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from src.config.config import Config
+
+class SemanticResponseCache:
+    """LRU cache of chat responses matched by query embedding similarity.
+
+    A cached response is only reused for the same retrieved product set and
+    conversation context, and when the new query embedding is within the
+    configured cosine similarity of the cached one.
+    """
+
+    def __init__(self, max_entries=None, ttl_seconds=None, similarity_threshold=None):
+        """Initialize an empty cache."""
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or Config.RESPONSE_CACHE_TTL_SECONDS
+        self.similarity_threshold = similarity_threshold or Config.RESPONSE_CACHE_SIMILARITY
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _group_key(product_ids, context_key):
+        """Entries are only comparable within the same product set and context."""
+        return frozenset(str(pid) for pid in product_ids), context_key
+
+    def get(self, query_vector, product_ids, context_key):
+        """Return the best matching cached response, or None."""
+        group = self._group_key(product_ids, context_key)
+        vector = np.asarray(query_vector)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_similarity = None, self.similarity_threshold
+            for entry_id, entry in list(self._entries.items()):
+                if now - entry['created_at'] > self.ttl_seconds:
+                    del self._entries[entry_id]
+                    continue
+                if entry['group'] != group:
+                    continue
+                similarity = float(np.dot(entry['vector'], vector))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id]['response']
+
+    def put(self, query_vector, product_ids, context_key, response):
+        """Store a response, evicting the least recently used entries when full."""
+        with self._lock:
+            self._entries[self._next_id] = {
+                'vector': np.asarray(query_vector),
+                'group': self._group_key(product_ids, context_key),
+                'response': response,
+                'created_at': time.time()
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry, e.g. after the product index has been rebuilt."""
+        with self._lock:
+            self._entries.clear()
+        print("✅ Response cache cleared")
+
+    def get_stats(self):
+        """Get hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+# Create a singleton instance
+response_cache = SemanticResponseCache()
@@ -1,6 +1,15 @@
-from flask import Blueprint, render_template, request, jsonify, session
-from src.handlers.chat_bot import chat_with_bot
+import json
+import queue
+import uuid
+from flask import Blueprint, Response, render_template, request, jsonify, session, stream_with_context
 from src.services.product_service import product_service
+from src.config.config import Config
+from src.handlers.model_registry import model_registry
+from src.handlers.embedding_handler import embeddings
+from src.handlers.response_cache import response_cache
+from src.services.chat_queue import chat_queue, QueueFullError
+from src.services.conversation_store import conversation_store
+from src.handlers.metrics import chat_metrics
 
 # Create blueprints for different parts of the application
 main = Blueprint('main', __name__)
@@ -10,47 +19,157 @@ admin = Blueprint('admin', __name__)
 @main.route('/')
 def home():
     """Home page route."""
-    # Initialize empty conversation history for new sessions
-    if 'conversation_history' not in session:
-        session['conversation_history'] = []
+    # History used to live in the cookie; it is kept server-side now
+    session.pop('conversation_history', None)
+    _get_conversation_id()
     return render_template('index.html')
 
+def _get_conversation_id():
+    """Return the session's conversation ID, also used to share the chat queue fairly."""
+    if 'conversation_id' not in session:
+        session['conversation_id'] = uuid.uuid4().hex
+    return session['conversation_id']
+
+def _queue_full_response(error):
+    """Build a 429 response for a rejected chat request."""
+    response = jsonify({'error': str(error), 'queue_length': error.queue_length})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def _job_response(job):
+    """Serialize a chat job, recording its exchange in the conversation once it is done."""
+    if job['status'] == 'done':
+        if not job['recorded']:
+            conversation_store.append_exchange(job['client_id'], job['message'], job['result']['response'])
+            job['recorded'] = True
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'response': job['result']['response'],
+            'debug_info': job['result']['debug_info']
+        })
+    if job['status'] == 'error':
+        return jsonify({'job_id': job['id'], 'status': job['status'], 'error': job['error']}), 500
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'position': chat_queue.get_position(job)
+    }), 202
+
 @chat.route('/chat', methods=['POST'])
 def handle_chat():
-    """Chat endpoint for handling messages."""
+    """Chat endpoint for handling messages.
+
+    The request runs on the chat worker pool. If no worker picks it up within
+    CHAT_START_WAIT_SECONDS, or it does not finish within
+    CHAT_REQUEST_TIMEOUT_SECONDS, a job ID is returned to poll instead, so
+    queued requests don't hold a request thread.
+    """
     message = request.json.get('message', '')
     if not message:
         return jsonify({'error': 'No message provided'}), 400
     
-    # Get conversation history from session
-    conversation_history = session.get('conversation_history', [])
-    
-    # Call chat_with_bot with conversation history
-    result = chat_with_bot(message, conversation_history)
-    response = result["response"]
-    debug_info = result["debug_info"]
-    
-    # Update conversation history
-    conversation_history.append({
-        'role': 'user',
-        'content': message
-    })
-    conversation_history.append({
-        'role': 'assistant',
-        'content': response
-    })
-    
-    # Keep only last 10 messages to prevent session from growing too large
-    if len(conversation_history) > 10:
-        conversation_history = conversation_history[-10:]
-    
-    # Save updated history back to session
-    session['conversation_history'] = conversation_history
+    conversation_id = _get_conversation_id()
+    conversation = conversation_store.get(conversation_id)
     
+    try:
+        job = chat_queue.submit(
+            conversation_id, message, conversation['messages'], conversation['history_context']
+        )
+    except QueueFullError as e:
+        return _queue_full_response(e)
+
+    if chat_queue.wait_until_started(job, timeout=Config.CHAT_START_WAIT_SECONDS):
+        chat_queue.wait(job, timeout=Config.CHAT_REQUEST_TIMEOUT_SECONDS)
+    return _job_response(job)
+
+@chat.route('/chat/jobs', methods=['POST'])
+def submit_chat_job():
+    """Queue a chat message and return a job ID to poll."""
+    message = request.json.get('message', '')
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    conversation_id = _get_conversation_id()
+    conversation = conversation_store.get(conversation_id)
+
+    try:
+        job = chat_queue.submit(
+            conversation_id, message, conversation['messages'], conversation['history_context']
+        )
+    except QueueFullError as e:
+        return _queue_full_response(e)
+
     return jsonify({
-        'response': response,
-        'debug_info': debug_info
-    })
+        'job_id': job['id'],
+        'status': job['status'],
+        'position': chat_queue.get_position(job)
+    }), 202
+
+@chat.route('/chat/jobs/<job_id>')
+def get_chat_job(job_id):
+    """Poll a queued chat job for its position or result."""
+    job = chat_queue.get_job(job_id)
+    if not job or job['client_id'] != session.get('conversation_id'):
+        return jsonify({'error': 'Job not found'}), 404
+    return _job_response(job)
+
+@chat.route('/chat/stream', methods=['POST'])
+def handle_chat_stream():
+    """Streaming chat endpoint that sends response tokens as server-sent events.
+
+    Generation runs on the chat worker pool like any other job. While the job
+    waits, 'queued' events report its position; once it runs, the worker's
+    events are relayed as they arrive.
+    """
+    message = request.json.get('message', '')
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    conversation_id = _get_conversation_id()
+    conversation = conversation_store.get(conversation_id)
+
+    try:
+        job = chat_queue.submit(
+            conversation_id, message, conversation['messages'], conversation['history_context'],
+            stream=True
+        )
+    except QueueFullError as e:
+        return _queue_full_response(e)
+
+    def generate():
+        try:
+            while True:
+                try:
+                    event = job['events'].get(timeout=Config.CHAT_STREAM_POLL_SECONDS)
+                except queue.Empty:
+                    position = chat_queue.get_position(job)
+                    if position:
+                        yield f"data: {json.dumps({'type': 'queued', 'position': position})}\n\n"
+                    continue
+                if event is None:
+                    break
+                if event['type'] == 'done' and event['response']:
+                    # History is stored server-side, so it can be recorded after streaming
+                    conversation_store.append_exchange(conversation_id, message, event['response'])
+                    job['recorded'] = True
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            if not job['done'].is_set():
+                # The client disconnected; free the worker
+                chat_queue.cancel(job)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@chat.route('/chat/clear', methods=['POST'])
+def clear_chat():
+    """Forget the session's conversation history."""
+    conversation_store.delete(_get_conversation_id())
+    return jsonify({'status': 'success'})
 
 @admin.route('/')
 @admin.route('/dashboard')
@@ -72,12 +191,69 @@ def get_indexing_status():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin.route('/admin/models/status')
+def get_models_status():
+    """Get load time and memory usage of the shared embedding models."""
+    try:
+        stats = model_registry.get_stats()
+        stats['query_cache'] = embeddings.query_cache.get_stats()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin.route('/admin/models/parity')
+def get_models_parity():
+    """Compare the configured embedding backend against the stored vectors."""
+    try:
+        sample_size = request.args.get('sample_size', type=int)
+        return jsonify(product_service.check_embedding_parity(sample_size))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin.route('/admin/cache/responses')
+def get_response_cache_stats():
+    """Get semantic response cache statistics."""
+    return jsonify(response_cache.get_stats())
+
+@admin.route('/admin/cache/responses/clear', methods=['POST'])
+def clear_response_cache():
+    """Drop all cached chat responses."""
+    response_cache.clear()
+    return jsonify({'status': 'success'})
+
+@admin.route('/admin/chat/queue')
+def get_chat_queue_stats():
+    """Get chat worker pool and queue statistics."""
+    return jsonify(chat_queue.get_stats())
+
+@admin.route('/admin/metrics/chat')
+def get_chat_metrics():
+    """Get latency percentiles per chat pipeline stage and LLM token throughput."""
+    return jsonify(chat_metrics.get_stats())
+
+@admin.route('/admin/metrics/chat/reset', methods=['POST'])
+def reset_chat_metrics():
+    """Drop collected chat latency samples."""
+    chat_metrics.reset()
+    return jsonify({'status': 'success'})
+
+@admin.route('/admin/indexing/stats')
+def get_indexing_stats():
+    """Get indexed product counts broken down by product type."""
+    try:
+        return jsonify(product_service.get_index_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin.route('/admin/indexing/start', methods=['POST'])
 def start_indexing():
     """Start the indexing process."""
     try:
-        product_service.start_indexing()
+        data = request.get_json(silent=True) or {}
+        product_service.start_indexing(mode=data.get('mode', 'full'))
         return jsonify({'status': 'started'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -90,6 +266,15 @@ def get_indexing_progress():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin.route('/admin/indexing/history')
+def get_indexing_history():
+    """Get past indexing runs with their stage timings, newest first."""
+    try:
+        limit = request.args.get('limit', default=20, type=int)
+        return jsonify({'runs': product_service.get_indexing_history(limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin.route('/admin/indexing/cleanup', methods=['POST'])
 def cleanup_index():
     """Clean up the vector database."""
@@ -121,11 +306,15 @@ def get_embeddings_data():
     except ValueError:
         return jsonify({'error': 'Invalid pagination parameters'}), 400
 
-    preview_data = product_service.preview_product_embedding(
-        page=page, 
-        per_page=per_page,
-        filters=filters
-    )
+    try:
+        preview_data = product_service.preview_product_embedding(
+            page=page, 
+            per_page=per_page,
+            filters=filters,
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(preview_data)
 
 @admin.route('/admin/embeddings/<int:product_id>')
@@ -151,6 +340,43 @@ def get_vectors_data():
         'ids': ids
     })
 
+@admin.route('/admin/embeddings/data/projection')
+def get_projection_data():
+    """Return server-side 2-D/3-D projections of all embeddings."""
+    method = request.args.get('method', 'pca')
+    if method not in ('pca', 'umap'):
+        return jsonify({'error': 'Unknown projection method'}), 400
+    try:
+        dims = int(request.args.get('dims', 2))
+    except ValueError:
+        return jsonify({'error': 'Invalid dims parameter'}), 400
+    if dims not in (2, 3):
+        return jsonify({'error': 'dims must be 2 or 3'}), 400
+
+    try:
+        return jsonify(product_service.get_embedding_projection(method=method, dims=dims))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin.route('/admin/embeddings/data/vectors.bin')
+def get_vectors_binary():
+    """Return raw embeddings as a packed float16/float32 matrix.
+
+    Row order matches the 'ids' of /admin/embeddings/data/projection for the
+    same X-Index-Version.
+    """
+    dtype = request.args.get('dtype', 'float16')
+    if dtype not in ('float16', 'float32'):
+        return jsonify({'error': 'dtype must be float16 or float32'}), 400
+
+    payload, ids, dimension = product_service.get_embedding_vectors_binary(dtype)
+    return Response(payload, mimetype='application/octet-stream', headers={
+        'X-Vector-Count': str(len(ids)),
+        'X-Vector-Dim': str(dimension),
+        'X-Vector-Dtype': dtype,
+        'X-Index-Version': product_service.vector_db.get_index_version()
+    })
+
 @admin.route('/admin/search')
 def search_page():
     """Display vector search page."""
@@ -0,0 +1,201 @@
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from src.config.config import Config
+from src.handlers.chat_bot import chat_with_bot, chat_with_bot_stream
+
+class QueueFullError(Exception):
+    """Raised when a chat job cannot be accepted because the queue is saturated."""
+
+    def __init__(self, message, queue_length, retry_after):
+        super().__init__(message)
+        self.queue_length = queue_length
+        self.retry_after = retry_after
+
+class ChatJobQueue:
+    """Bounded worker pool that runs chat requests off the request threads.
+
+    Jobs run in FIFO order on a fixed number of workers. Each client may only
+    have a limited number of jobs waiting, and the queue refuses new jobs
+    once it is full, so a burst of chat traffic is rejected quickly instead
+    of occupying every WSGI thread. Streaming jobs share the same workers and
+    limits; their events are handed to the request thread through a per-job
+    queue.
+    """
+
+    def __init__(self, workers=None, max_queue=None, max_jobs_per_client=None):
+        """Initialize the queue; worker threads are started on first use."""
+        self.workers = workers or Config.CHAT_WORKERS
+        self.max_queue = max_queue or Config.CHAT_MAX_QUEUE
+        self.max_jobs_per_client = max_jobs_per_client or Config.CHAT_MAX_JOBS_PER_CLIENT
+        self._queue = deque()
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _ensure_workers(self):
+        """Start the worker threads if they are not running yet."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"chat-worker-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, client_id, message, conversation_history, history_context=None, stream=False):
+        """Queue a chat request and return its job.
+
+        Args:
+            stream (bool): Run chat_with_bot_stream and publish its events
+                to job['events'] instead of storing a single result
+
+        Raises:
+            QueueFullError: When the queue or the client's share of it is full
+        """
+        with self._condition:
+            self._ensure_workers()
+            self._prune_finished_jobs()
+
+            client_pending = sum(1 for job in self._queue if job['client_id'] == client_id)
+            if client_pending >= self.max_jobs_per_client:
+                self._rejected += 1
+                raise QueueFullError(
+                    "You already have a message waiting to be answered",
+                    len(self._queue), Config.CHAT_RETRY_AFTER_SECONDS
+                )
+            if len(self._queue) >= self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(
+                    "The assistant is busy, please try again shortly",
+                    len(self._queue), Config.CHAT_RETRY_AFTER_SECONDS
+                )
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'client_id': client_id,
+                'message': message,
+                'conversation_history': list(conversation_history),
+                'history_context': history_context,
+                'status': 'queued',
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'finished_at': None,
+                'recorded': False,
+                'stream': stream,
+                'events': queue.Queue() if stream else None,
+                'cancelled': False,
+                'started': threading.Event(),
+                'done': threading.Event()
+            }
+            self._jobs[job['id']] = job
+            self._queue.append(job)
+            self._condition.notify()
+            return job
+
+    def get_job(self, job_id):
+        """Return a job by ID, or None if unknown or expired."""
+        return self._jobs.get(job_id)
+
+    def get_position(self, job):
+        """Return the 1-based queue position of a waiting job, or 0 once it has started."""
+        with self._condition:
+            for position, queued in enumerate(self._queue, 1):
+                if queued is job:
+                    return position
+        return 0
+
+    def wait(self, job, timeout=None):
+        """Block until the job finishes or the timeout expires; return True if finished."""
+        return job['done'].wait(timeout)
+
+    def wait_until_started(self, job, timeout=None):
+        """Block until a worker picks the job up; return True if it has started."""
+        return job['started'].wait(timeout)
+
+    def cancel(self, job):
+        """Stop a job whose client went away: drop it if queued, else stop streaming it."""
+        with self._condition:
+            job['cancelled'] = True
+            if job in self._queue:
+                self._queue.remove(job)
+                job['status'] = 'cancelled'
+                job['finished_at'] = time.time()
+                job['done'].set()
+
+    def _run_stream(self, job):
+        """Run a streaming job, publishing each event until done or cancelled."""
+        stream = chat_with_bot_stream(job['message'], job['conversation_history'], job['history_context'])
+        try:
+            for event in stream:
+                if job['cancelled']:
+                    break
+                if event['type'] == 'done':
+                    job['result'] = {'response': event['response'], 'debug_info': event['debug_info']}
+                job['events'].put(event)
+        finally:
+            stream.close()
+
+    def _worker(self):
+        """Take jobs off the queue and run them until the process exits."""
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                job = self._queue.popleft()
+                job['status'] = 'running'
+                self._running += 1
+            job['started'].set()
+
+            try:
+                if job['stream']:
+                    self._run_stream(job)
+                else:
+                    job['result'] = chat_with_bot(
+                        job['message'], job['conversation_history'], job['history_context']
+                    )
+                job['status'] = 'done'
+            except Exception as e:
+                print(f"❌ Error processing chat job {job['id']}: {str(e)}")
+                job['error'] = str(e)
+                job['status'] = 'error'
+                if job['stream']:
+                    job['events'].put({'type': 'error', 'error': str(e)})
+            finally:
+                job['finished_at'] = time.time()
+                with self._condition:
+                    self._running -= 1
+                    self._completed += 1
+                if job['stream']:
+                    job['events'].put(None)  # End of stream
+                job['done'].set()
+
+    def _prune_finished_jobs(self):
+        """Forget finished jobs whose results were never collected."""
+        cutoff = time.time() - Config.CHAT_JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished_at'] and job['finished_at'] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get_stats(self):
+        """Get current queue length, worker usage and totals."""
+        return {
+            'workers': self.workers,
+            'running': self._running,
+            'queued': len(self._queue),
+            'max_queue': self.max_queue,
+            'completed': self._completed,
+            'rejected': self._rejected
+        }
+
+# Create a singleton instance
+chat_queue = ChatJobQueue()
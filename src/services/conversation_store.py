@@ -0,0 +1,155 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from src.config.config import Config
+from src.handlers.chat_bot import new_history_context, update_history_context
+
+def _new_conversation():
+    """Return the state of an empty conversation."""
+    return {'messages': [], 'history_context': new_history_context(), 'updated_at': time.time()}
+
+def _apply_exchange(conversation, message, response):
+    """Append an exchange, updating the precomputed history context incrementally."""
+    for entry in ({'role': 'user', 'content': message}, {'role': 'assistant', 'content': response}):
+        conversation['messages'].append(entry)
+        update_history_context(conversation['history_context'], entry)
+
+    # Keep only the last messages for the extraction prompt
+    del conversation['messages'][:-Config.CONVERSATION_MAX_MESSAGES]
+    conversation['updated_at'] = time.time()
+    return conversation
+
+class MemoryConversationStore:
+    """In-process conversation store with a TTL and an LRU bound.
+
+    Each conversation keeps its recent messages plus a history context that
+    is updated once per message, so requests never re-scan the whole history.
+    """
+
+    def __init__(self, ttl_seconds=None, max_conversations=None):
+        """Initialize an empty store."""
+        self.ttl_seconds = ttl_seconds or Config.CONVERSATION_TTL_SECONDS
+        self.max_conversations = max_conversations or Config.CONVERSATION_MAX_CONVERSATIONS
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        """Return a copy of a conversation's state, empty if unknown or expired."""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None or time.time() - conversation['updated_at'] > self.ttl_seconds:
+                return _new_conversation()
+            self._conversations.move_to_end(conversation_id)
+            # Round-trip through JSON so callers can't mutate the stored state
+            return json.loads(json.dumps(conversation))
+
+    def append_exchange(self, conversation_id, message, response):
+        """Record a completed exchange."""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None or time.time() - conversation['updated_at'] > self.ttl_seconds:
+                conversation = _new_conversation()
+            self._conversations[conversation_id] = _apply_exchange(conversation, message, response)
+            self._conversations.move_to_end(conversation_id)
+            self._prune()
+
+    def delete(self, conversation_id):
+        """Forget a conversation."""
+        with self._lock:
+            self._conversations.pop(conversation_id, None)
+
+    def _prune(self):
+        """Drop expired conversations and the least recently used beyond the bound."""
+        cutoff = time.time() - self.ttl_seconds
+        while self._conversations:
+            oldest_id, oldest = next(iter(self._conversations.items()))
+            if oldest['updated_at'] >= cutoff and len(self._conversations) <= self.max_conversations:
+                break
+            del self._conversations[oldest_id]
+
+    def get_stats(self):
+        """Get the store type and number of live conversations."""
+        return {'backend': 'memory', 'conversations': len(self._conversations)}
+
+class SQLiteConversationStore:
+    """Conversation store persisted in SQLite so history survives restarts
+    and is shared between worker processes.
+    """
+
+    def __init__(self, path=None, ttl_seconds=None):
+        """Open (creating if needed) the conversation database."""
+        self.path = path or Config.CONVERSATION_DB_PATH
+        self.ttl_seconds = ttl_seconds or Config.CONVERSATION_TTL_SECONDS
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (updated_at)"
+            )
+
+    def _connect(self):
+        """Return this thread's connection to the database."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _load(self, connection, conversation_id):
+        row = connection.execute(
+            "SELECT state FROM conversations WHERE id = ? AND updated_at >= ?",
+            (conversation_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return json.loads(row[0]) if row else _new_conversation()
+
+    def get(self, conversation_id):
+        """Return a conversation's state, empty if unknown or expired."""
+        return self._load(self._connect(), conversation_id)
+
+    def append_exchange(self, conversation_id, message, response):
+        """Record a completed exchange."""
+        connection = self._connect()
+        with self._lock, connection:
+            # Take the write lock before reading so writers in other processes can't interleave
+            connection.execute("BEGIN IMMEDIATE")
+            conversation = _apply_exchange(self._load(connection, conversation_id), message, response)
+            connection.execute(
+                "INSERT OR REPLACE INTO conversations (id, state, updated_at) VALUES (?, ?, ?)",
+                (conversation_id, json.dumps(conversation), conversation['updated_at'])
+            )
+            connection.execute(
+                "DELETE FROM conversations WHERE updated_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+
+    def delete(self, conversation_id):
+        """Forget a conversation."""
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+
+    def get_stats(self):
+        """Get the store type and number of live conversations."""
+        count = self._connect().execute(
+            "SELECT COUNT(*) FROM conversations WHERE updated_at >= ?",
+            (time.time() - self.ttl_seconds,)
+        ).fetchone()[0]
+        return {'backend': 'sqlite', 'conversations': count}
+
+def create_conversation_store():
+    """Create the conversation store selected by Config.CONVERSATION_STORE."""
+    if Config.CONVERSATION_STORE == 'sqlite':
+        return SQLiteConversationStore()
+    if Config.CONVERSATION_STORE != 'memory':
+        raise ValueError(f"Unknown conversation store: {Config.CONVERSATION_STORE}")
+    return MemoryConversationStore()
+
+# Create a singleton instance
+conversation_store = create_conversation_store()
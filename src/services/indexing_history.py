@@ -0,0 +1,65 @@
+import json
+import os
+import sqlite3
+import threading
+from src.config.config import Config
+
+class IndexingRunHistory:
+    """Record of finished indexing runs persisted in SQLite next to the index,
+    so the last indexing time and past throughput survive restarts and are
+    shared between worker processes.
+    """
+
+    def __init__(self, path=None, max_runs=None):
+        """Open (creating if needed) the history database."""
+        self.path = path or Config.INDEXING_HISTORY_PATH
+        self.max_runs = max_runs or Config.INDEXING_HISTORY_MAX_RUNS
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS indexing_runs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, status TEXT NOT NULL, "
+                "finished_at TEXT, run TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        """Return this thread's connection to the database."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def record(self, run):
+        """Append a finished run, keeping only the most recent max_runs."""
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO indexing_runs (status, finished_at, run) VALUES (?, ?, ?)",
+                    (run.get('status'), run.get('finished_at'), json.dumps(run))
+                )
+                connection.execute(
+                    "DELETE FROM indexing_runs WHERE id NOT IN "
+                    "(SELECT id FROM indexing_runs ORDER BY id DESC LIMIT ?)",
+                    (self.max_runs,)
+                )
+        except sqlite3.Error as e:
+            print(f"❌ Failed to save indexing history: {str(e)}")
+
+    def get_runs(self, limit=None):
+        """Return recorded runs, newest first."""
+        rows = self._connect().execute(
+            "SELECT run FROM indexing_runs ORDER BY id DESC LIMIT ?",
+            (limit or self.max_runs,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def last_indexed(self):
+        """Finish time of the most recent completed run, or None."""
+        row = self._connect().execute(
+            "SELECT finished_at FROM indexing_runs WHERE status = 'completed' ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
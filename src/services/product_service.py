@@ -1,118 +1,308 @@
-from src.handlers.data_processor import clean_and_enhance_text, extract_product_type
-from src.handlers.mysql_handler import MySQLHandler
-from src.handlers.chroma_handler import ChromaHandler
-from src.handlers.embedding_handler import EmbeddingHandler
+from src.config.config import Config
+from src.handlers.data_processor import prepare_product_text
+from src.handlers.cleaning_pool import CleaningPool
+from src.handlers.mysql_handler import mysql_db
+from src.handlers.chroma_handler import vector_db
+from src.handlers.embedding_handler import embeddings
+from src.handlers.response_cache import response_cache
+from src.handlers.projection import reduce_dimensions
+from src.handlers.metrics import IndexingProfiler
+from src.services.indexing_history import IndexingRunHistory
 
 class ProductService:
     """Service layer for coordinating product-related operations."""
     
     def __init__(self):
         """Initialize service with its dependencies."""
-        self.mysql = MySQLHandler()
-        self.vector_db = ChromaHandler()
-        self.embeddings = EmbeddingHandler()
+        self.mysql = mysql_db
+        self.vector_db = vector_db
+        self.embeddings = embeddings
+        self._active_count_cache = None  # (count, timestamp) of the last MySQL count
+        self._projection_cache = {}  # (index version, method, dims) -> projection
+        self._cleaning_pool = None  # Created on first large indexing chunk
+        self._profiler = None  # IndexingProfiler of the running indexing job
+        self.indexing_history = IndexingRunHistory()
         self._indexing_status = {
             'status': 'idle',
+            'mode': None,
             'progress': 0,
             'current_product': None,
             'total_products': 0,
             'processed_products': 0,
-            'last_indexed': None,
+            'last_indexed': self.indexing_history.last_indexed(),
+            'started_at': None,
+            'eta_seconds': None,
+            'profile': None,  # Per-stage timings, throughput and memory of the current run
             'error': None,
-            'errors': []  # List to store individual product errors
+            'errors': [],  # List to store individual product errors
+            'changes': None,  # Added/updated/removed counts for incremental runs
+            'embedding_cache': self.embeddings.cache.get_stats()
         }
 
     def get_indexing_status(self):
         """Get current indexing status and statistics."""
-        total_products = self.mysql.count_active_products()
+        total_products = self._count_active_products_cached()
         indexed_products = self.vector_db.count_indexed_products()
         
         return {
             'total_products': total_products,
             'indexed_products': indexed_products,
-            'last_indexed': self._indexing_status['last_indexed']
+            # Read from the shared history so runs in other processes show up
+            'last_indexed': self.indexing_history.last_indexed()
         }
 
+    def get_index_stats(self):
+        """Get indexed counts with a per-product_type breakdown."""
+        return {
+            **self.get_indexing_status(),
+            'by_product_type': self.vector_db.count_by_product_type()
+        }
+
+    def _count_active_products_cached(self):
+        """Count active products in MySQL, reusing the result for STATS_CACHE_TTL_SECONDS.
+
+        The catalog changes outside this app, so a short TTL is used instead of invalidation.
+        """
+        import time
+        cached = self._active_count_cache
+        if cached and time.time() - cached[1] < Config.STATS_CACHE_TTL_SECONDS:
+            return cached[0]
+
+        count = self.mysql.count_active_products()
+        self._active_count_cache = (count, time.time())
+        return count
+
     def get_indexing_progress(self):
         """Get current indexing progress."""
         return self._indexing_status
 
-    def start_indexing(self):
-        """Start the indexing process in a background thread."""
+    def get_indexing_history(self, limit=None):
+        """Get recorded indexing runs, newest first."""
+        return self.indexing_history.get_runs(limit)
+
+    def start_indexing(self, mode='full'):
+        """Start the indexing process in a background thread.
+
+        Args:
+            mode (str): 'full' rebuilds the whole index, 'incremental' only
+                re-embeds new or changed products and drops deactivated ones
+        """
         if self._indexing_status['status'] == 'in_progress':
             raise Exception('Indexing is already in progress')
+        if mode not in ('full', 'incremental'):
+            raise ValueError(f"Unknown indexing mode: {mode}")
 
         import threading
-        thread = threading.Thread(target=self._run_indexing)
+        thread = threading.Thread(target=self._run_indexing, args=(mode,))
         thread.daemon = True
         thread.start()
 
-    def _run_indexing(self):
+    def _run_indexing(self, mode='full'):
         """Run the indexing process."""
+        import time
+        from datetime import datetime
+        target_collection = None
+        self._profiler = profiler = IndexingProfiler()
         try:
             # Reset status
             self._indexing_status.update({
                 'status': 'in_progress',
+                'mode': mode,
                 'progress': 0,
                 'current_product': None,
+                'processed_products': 0,
+                'started_at': datetime.now().isoformat(),
+                'eta_seconds': None,
+                'profile': None,
                 'error': None,
-                'errors': []
+                'errors': [],
+                'changes': None
             })
+            self.embeddings.cache.reset()
 
-            # Clean up existing index
-            if not self.vector_db.cleanup_index():
-                raise Exception("Failed to clean up existing index")
+            chunk_size = Config.INDEXING_CHUNK_SIZE
+            if mode == 'incremental':
+                # Only changed products are kept in memory
+                with profiler.stage('plan'):
+                    products = self._plan_incremental_update(self.mysql.iter_active_products(chunk_size))
+                total = len(products)
+                chunks = (products[start:start + chunk_size] for start in range(0, total, chunk_size))
+            else:
+                # Build into a shadow collection so the live one keeps serving searches
+                target_collection = self.vector_db.create_shadow_collection()
+                # Stream products from MySQL instead of loading the whole catalog
+                total = self.mysql.count_active_products()
+                chunks = self.mysql.iter_active_products(chunk_size)
 
-            # Get all products
-            products = self.mysql.fetch_active_products()
-            total = len(products)
             self._indexing_status['total_products'] = total
+            profiler.total = total
 
-            for i, product in enumerate(products, 1):
-                try:
-                    # Update status
-                    self._indexing_status.update({
-                        'current_product': f"Product {product['id']}",
-                        'progress': int((i / total) * 100),
-                        'processed_products': i
-                    })
+            processed = 0
+            chunks = iter(chunks)
+            while True:
+                # Time the MySQL fetch separately from the work done on each chunk
+                chunk_start = time.perf_counter()
+                chunk = next(chunks, None)
+                fetch_seconds = time.perf_counter() - chunk_start
+                if not chunk:
+                    break
+                profiler.add('fetch', fetch_seconds, len(chunk))
+                processed += len(chunk)
 
-                    # Index the product
-                    self._index_single_product(product)
+                # Update status
+                self._indexing_status.update({
+                    'current_product': f"Products {chunk[0]['id']} - {chunk[-1]['id']}",
+                    'progress': min(int((processed / max(total, 1)) * 100), 100),
+                    'processed_products': processed
+                })
 
-                except Exception as e:
-                    error_msg = f"Error indexing product {product['id']}: {str(e)}"
-                    print(error_msg)
-                    self._indexing_status['errors'].append(error_msg)
-                    # Continue with next product
+                # Index the whole chunk at once
+                self._index_products_batch(
+                    chunk,
+                    upsert=(mode == 'incremental'),
+                    collection=target_collection
+                )
+                profiler.chunk_done(len(chunk), time.perf_counter() - chunk_start)
+                self._indexing_status.update({
+                    'embedding_cache': self.embeddings.cache.get_stats(),
+                    'eta_seconds': profiler.eta_seconds(processed),
+                    'profile': profiler.to_dict(processed)
+                })
+
+            with profiler.stage('finalize'):
+                self.vector_db.save_lexical_index(target_collection)
+                if target_collection is not None:
+                    self._activate_shadow_collection(target_collection)
+
+            # Cached answers may reference products that changed
+            response_cache.clear()
+            self._active_count_cache = None
 
             # Update final status
-            from datetime import datetime
             self._indexing_status.update({
                 'status': 'completed',
                 'progress': 100,
                 'current_product': None,
                 'last_indexed': datetime.now().isoformat(),
+                'eta_seconds': 0,
+                'profile': profiler.to_dict(processed),
                 'error': None if not self._indexing_status['errors'] else f"Completed with {len(self._indexing_status['errors'])} errors"
             })
 
         except Exception as e:
+            if mode == 'full' and target_collection is not None:
+                self.vector_db.drop_collection(target_collection.name)
             self._indexing_status.update({
                 'status': 'error',
                 'error': str(e),
-                'progress': 0
+                'progress': 0,
+                'eta_seconds': None,
+                'profile': profiler.to_dict(self._indexing_status['processed_products'])
             })
+        finally:
+            self._shutdown_cleaning_pool()
+            self._profiler = None
+            self._record_indexing_run()
+
+    def _record_indexing_run(self):
+        """Append the finished run to the persisted indexing history."""
+        from datetime import datetime
+        status = self._indexing_status
+        self.indexing_history.record({
+            'mode': status['mode'],
+            'status': status['status'],
+            'started_at': status['started_at'],
+            'finished_at': datetime.now().isoformat(),
+            'total_products': status['total_products'],
+            'processed_products': status['processed_products'],
+            'errors': len(status['errors']),
+            'error': status['error'],
+            'changes': status['changes'],
+            'profile': status['profile']
+        })
+
+    def _activate_shadow_collection(self, collection):
+        """Validate a freshly built collection, make it live and drop the old one."""
+        import time
+        expected = self.mysql.count_active_products()
+        indexed = collection.count()
+        if indexed < expected * Config.REINDEX_MIN_COVERAGE:
+            raise Exception(
+                f"Rebuilt index has {indexed} of {expected} active products; keeping the current index"
+            )
+
+        previous_name = self.vector_db.activate_collection(collection)
+
+        # Give in-flight searches on the old collection a moment to finish
+        time.sleep(Config.COLLECTION_SWAP_GRACE_SECONDS)
+        self.vector_db.drop_collection(previous_name)
+        self.vector_db.garbage_collect_collections()
+
+    def _plan_incremental_update(self, product_batches):
+        """Compare active products against the index and return those needing embedding.
+
+        Args:
+            product_batches (iterable): Batches of active products, e.g. from
+                MySQLHandler.iter_active_products
+
+        Products that are no longer active are removed from the index right away.
+        """
+        indexed_hashes = self.vector_db.get_content_hashes()
+        active_ids = set()
+        added, updated = [], []
+
+        for batch in product_batches:
+            for product in batch:
+                product_id = str(product['id'])
+                active_ids.add(product_id)
+                indexed_hash = indexed_hashes.get(product_id)
+                if indexed_hash is None and product_id not in indexed_hashes:
+                    added.append(product)
+                elif indexed_hash != self._compute_content_hash(product):
+                    updated.append(product)
+
+        removed = [pid for pid in indexed_hashes if pid not in active_ids]
+        if removed and not self.vector_db.remove_products(removed):
+            raise Exception("Failed to remove deactivated products from index")
+
+        self._indexing_status['changes'] = {
+            'added': len(added),
+            'updated': len(updated),
+            'removed': len(removed),
+            'unchanged': len(active_ids) - len(added) - len(updated)
+        }
+        print(f"📝 Incremental indexing plan: {self._indexing_status['changes']}")
+        return added + updated
+
+    @staticmethod
+    def _compute_content_hash(product):
+        """Hash the raw fields that feed the embedding, plus the model and weights used."""
+        import hashlib
+        import json
+        payload = json.dumps([
+            product.get('name_en') or '',
+            product.get('descr_en') or '',
+            product.get('descr2_en') or '',
+            product.get('tags_en') or '',
+            Config.EMBEDDING_MODEL,
+            Config.VECTOR_WEIGHTS
+        ], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
     def index_all_products(self):
         """Index all active products from MySQL into the vector database."""
-        products = self.mysql.fetch_active_products()
-        if not products:
+        indexed = 0
+        try:
+            for chunk in self.mysql.iter_active_products(Config.INDEXING_CHUNK_SIZE):
+                self._index_products_batch(chunk)
+                indexed += len(chunk)
+        finally:
+            self._shutdown_cleaning_pool()
+
+        if not indexed:
             print("❌ No products found in MySQL!")
             return
 
-        for product in products:
-            self._index_single_product(product)
-
         print("✅ Products indexed successfully!")
 
     def _prepare_product_data(self, product, create_embedding=True):
@@ -129,43 +319,18 @@ class ProductService:
                 processed_data (dict): Cleaned and processed text
                 embedding_data (dict): Data ready for vector database (if create_embedding=True)
         """
-        # Extract original fields
-        name = product.get("name_en", "")
-        description = " ".join([
-            product.get("descr_en", ""),
-            product.get("descr2_en", "")
-        ])
-        tags = product.get("tags_en", "")
-        
-        # Clean and process text
-        name_clean = clean_and_enhance_text(name)
-        description_clean = clean_and_enhance_text(description)
-        tags_clean = clean_and_enhance_text(tags, is_tags=True)
-        
-        # Extract product type
-        product_type = extract_product_type(name_clean, tags_clean)
-        
-        original_data = {
-            'name': name,
-            'description': description,
-            'tags': tags
-        }
-        
-        processed_data = {
-            'name_clean': name_clean,
-            'product_type': product_type,
-            'description_clean': description_clean,
-            'tags_clean': tags_clean
-        }
+        original_data, processed_data = prepare_product_text(product)
+        product_type = processed_data['product_type']
         
         if create_embedding:
-            enhanced_name = f"{product_type} {name_clean}"
+            enhanced_name = f"{product_type} {processed_data['name_clean']}"
             # Create embedding
             embedding_result = self.embeddings.create_product_embedding(
                 enhanced_name, 
-                description_clean, 
-                tags_clean, 
-                product_type
+                processed_data['description_clean'], 
+                processed_data['tags_clean'], 
+                product_type,
+                already_clean=True
             )
             
             embedding_data = embedding_result if embedding_result else None
@@ -174,7 +339,26 @@ class ProductService:
         
         return original_data, processed_data, embedding_data
 
-    def _index_single_product(self, product):
+    def _clean_products(self, products):
+        """Clean a chunk of products, across worker processes when the chunk is large.
+
+        Returns:
+            list: (original_data, processed_data) per product, in input order
+        """
+        if Config.CLEANING_WORKERS <= 0 or len(products) < Config.CLEANING_PARALLEL_MIN_BATCH:
+            return [prepare_product_text(product) for product in products]
+
+        if self._cleaning_pool is None:
+            self._cleaning_pool = CleaningPool()
+        return self._cleaning_pool.map(products)
+
+    def _shutdown_cleaning_pool(self):
+        """Stop the cleaning worker processes once an indexing run is over."""
+        if self._cleaning_pool is not None:
+            self._cleaning_pool.shutdown()
+            self._cleaning_pool = None
+
+    def _index_single_product(self, product, upsert=False, collection=None):
         """Index a single product into the vector database."""
         original_data, processed_data, embedding_data = self._prepare_product_data(product, create_embedding=True)
         
@@ -182,14 +366,64 @@ class ProductService:
             raise Exception("Failed to create embedding for product")
         
         product_id = str(product['id'])
-        url = self.vector_db.add_product(product_id, embedding_data)
+        embedding_data['content_hash'] = self._compute_content_hash(product)
+        url = self.vector_db.add_product(
+            product_id, embedding_data, upsert=upsert, collection=collection
+        )
         print(f"📝 Indexing: {processed_data['name_clean']} (Type: {processed_data['product_type']})")
 
-    def search_products(self, query, conversation_history=[]):
+    def _profile_stage(self, name, items=0):
+        """Time a stage into the running indexing job's profile, if there is one."""
+        if self._profiler is None:
+            from contextlib import nullcontext
+            return nullcontext()
+        return self._profiler.stage(name, items)
+
+    def _index_products_batch(self, products, upsert=False, collection=None):
+        """Index a chunk of products with batched embedding and a single vector DB write."""
+        try:
+            with self._profile_stage('clean', len(products)):
+                cleaned = self._clean_products(products)
+
+            batch_input = []
+            for _, processed_data in cleaned:
+                batch_input.append({
+                    'name': f"{processed_data['product_type']} {processed_data['name_clean']}",
+                    'description': processed_data['description_clean'],
+                    'tags': processed_data['tags_clean'],
+                    'product_type': processed_data['product_type']
+                })
+
+            with self._profile_stage('embed', len(products)):
+                embedding_results = self.embeddings.create_product_embeddings_batch(batch_input)
+            for product, result in zip(products, embedding_results):
+                result['content_hash'] = self._compute_content_hash(product)
+
+            product_ids = [str(product['id']) for product in products]
+            with self._profile_stage('write', len(products)):
+                written = self.vector_db.add_products(
+                    product_ids, embedding_results, upsert=upsert, collection=collection
+                )
+            if written is None:
+                raise Exception("Failed to write chunk to vector database")
+            print(f"📝 Indexed chunk of {len(products)} products")
+        except Exception as e:
+            # Fall back to one-by-one indexing so a single bad product doesn't drop the chunk
+            print(f"❌ Batch indexing failed, retrying products individually: {str(e)}")
+            with self._profile_stage('fallback', len(products)):
+                for product in products:
+                    try:
+                        self._index_single_product(product, upsert=upsert, collection=collection)
+                    except Exception as e:
+                        error_msg = f"Error indexing product {product['id']}: {str(e)}"
+                        print(error_msg)
+                        self._indexing_status['errors'].append(error_msg)
+
+    def search_products(self, query, conversation_history=[], categories=None):
         """Search for products using semantic search."""
         try:            
             # Search products using the embedding
-            results = self.vector_db.search_products(query, conversation_history)
+            results = self.vector_db.search_products(query, conversation_history, categories)
             return results
         except Exception as e:
             print(f"❌ Error searching products: {str(e)}")
@@ -212,50 +446,76 @@ class ProductService:
         """Print debug information about the vector index."""
         self.vector_db.debug_index()
 
-    def preview_product_embedding(self, page=1, per_page=10, filters=None):
-        """Preview how products will be processed for embedding with pagination."""
-        # Calculate offset
-        offset = (page - 1) * per_page
-        
-        # Get total count first
-        total_count = self.mysql.count_active_products(filters)
+    def preview_product_embedding(self, page=1, per_page=10, filters=None, cursor=None):
+        """Preview how products will be processed for embedding with pagination.
+
+        Pages are fetched with keyset pagination: pass the 'next_cursor' of the
+        previous page as cursor. Requesting page > 1 without a cursor falls back
+        to OFFSET pagination.
+        """
+        last_id = self._decode_cursor(cursor) if cursor else None
         
-        # Get paginated products
-        products = self.mysql.fetch_active_products_paginated(offset, per_page, filters)
+        # Fetch one extra row to know whether there is a next page
+        if cursor or page == 1:
+            products = self.mysql.fetch_active_products_before(last_id, per_page + 1, filters)
+        else:
+            offset = (page - 1) * per_page
+            products = self.mysql.fetch_active_products_paginated(offset, per_page + 1, filters)
+        has_next = len(products) > per_page
+        products = products[:per_page]
+
+        # The total only changes between full page loads, so count on the first request only
+        total_count = self.mysql.count_active_products(filters) if not cursor else None
+
+        # Get vector data for every product on the page in one call
+        vector_data_by_id = self.vector_db.get_products([product['id'] for product in products])
         
         preview_data = []
         for product in products:
             # Get clean data without creating embeddings
             original_data, processed_data, _ = self._prepare_product_data(product, create_embedding=False)
             
-            # Get vector data if product is already indexed
-            vector_data = self.vector_db.get_product(str(product['id']))
+            vector_data = vector_data_by_id.get(str(product['id']))
             
             preview_data.append({
                 'id': product['id'],
                 'original_data': original_data,
                 'processed_data': processed_data,
-                'embedding_vector': vector_data['embedding'][:5] + ['...'] if vector_data else [],
+                'embedding_vector': list(vector_data['embedding'][:5]) + ['...'] if vector_data else [],
                 'is_indexed': vector_data is not None
             })
 
-        # Calculate pagination metadata
-        total_pages = (total_count + per_page - 1) // per_page
-        has_next = page < total_pages
-        has_prev = page > 1
-
         return {
             'items': preview_data,
             'pagination': {
                 'page': page,
                 'per_page': per_page,
                 'total': total_count,
-                'total_pages': total_pages,
+                'total_pages': (total_count + per_page - 1) // per_page if total_count is not None else None,
                 'has_next': has_next,
-                'has_prev': has_prev
+                'has_prev': page > 1,
+                'next_cursor': self._encode_cursor(products[-1]['id']) if has_next else None
             }
         }
 
+    @staticmethod
+    def _encode_cursor(last_id):
+        """Encode the last product ID of a page as an opaque cursor token."""
+        import base64
+        return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        """Decode a cursor token back into a product ID."""
+        import base64
+        try:
+            prefix, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':', 1)
+            if prefix != 'id':
+                raise ValueError
+            return int(last_id)
+        except Exception:
+            raise ValueError('Invalid pagination cursor')
+
     def preview_single_product_embedding(self, product_id):
         """Preview embedding for a single product."""
         product = self.mysql.get_product_by_id(product_id)
@@ -278,6 +538,7 @@ class ProductService:
 
     def cleanup_index(self):
         """Clean up the vector database."""
+        response_cache.clear()
         return self.vector_db.cleanup_index()
 
     def remove_product(self, product_id):
@@ -304,5 +565,103 @@ class ProductService:
             print(f"❌ Error getting embeddings for visualization: {str(e)}")
             return [], [], []
 
+    def get_embedding_projection(self, method='pca', dims=2):
+        """Get 2-D/3-D coordinates of all indexed products for visualization.
+
+        Projections are computed server-side and cached per index version, so
+        only coordinates and light metadata are sent to the browser.
+        """
+        version = self.vector_db.get_index_version()
+        cache_key = (version, method, dims)
+        if cache_key in self._projection_cache:
+            return self._projection_cache[cache_key]
+
+        embeddings, metadatas, ids = self.get_embeddings_for_visualization()
+        projection = reduce_dimensions(embeddings, method=method, dims=dims)
+        result = {
+            'ids': ids,
+            'metadatas': [
+                {
+                    'name': metadata.get('name', ''),
+                    'product_type': metadata.get('product_type', ''),
+                    'tags': metadata.get('tags', ''),
+                    'url': metadata.get('url', '')
+                }
+                for metadata in metadatas
+            ],
+            'coordinates': projection['coordinates'],
+            'method': projection['method'],
+            'explained_variance': projection['explained_variance'],
+            'index_version': version
+        }
+
+        # Keep only projections of the current index version
+        self._projection_cache = {
+            key: value for key, value in self._projection_cache.items() if key[0] == version
+        }
+        self._projection_cache[cache_key] = result
+        return result
+
+    def get_embedding_vectors_binary(self, dtype='float16'):
+        """Get all embeddings as a packed little-endian float16/float32 row-major matrix.
+
+        Returns:
+            tuple: (payload bytes, ids, dimension)
+        """
+        import numpy as np
+        embeddings, _, ids = self.get_embeddings_for_visualization()
+        matrix = np.asarray(embeddings, dtype='<f2' if dtype == 'float16' else '<f4')
+        dimension = matrix.shape[1] if matrix.ndim == 2 else 0
+        return matrix.tobytes(), ids, dimension
+
+    def check_embedding_parity(self, sample_size=None):
+        """Re-encode stored products with the configured backend and measure drift.
+
+        Compares fresh vectors against the ones already stored in the vector
+        database, so an ONNX or int8 backend can be validated before it is
+        used for queries against an index built with fp32 torch.
+
+        Returns:
+            dict: Backend, cosine similarity summary and encoding throughput
+        """
+        import time
+        import numpy as np
+        sample = self.vector_db.get_sample(sample_size or Config.EMBEDDING_PARITY_SAMPLE_SIZE)
+        if not sample['ids']:
+            return {'backend': self.embeddings.backend, 'sample_size': 0}
+
+        # The stored name is the exact name text that was embedded (type prefix included)
+        batch_input = [
+            {
+                'name': metadata.get('name', ''),
+                'description': metadata.get('description', ''),
+                'tags': metadata.get('tags', ''),
+                'product_type': metadata.get('product_type', 'other')
+            }
+            for metadata in sample['metadatas']
+        ]
+
+        start = time.perf_counter()
+        results = self.embeddings.create_product_embeddings_batch(batch_input)
+        elapsed = time.perf_counter() - start
+
+        stored = np.asarray(sample['embeddings'], dtype=np.float32)
+        fresh = np.asarray([result['embedding'] for result in results], dtype=np.float32)
+        stored /= np.linalg.norm(stored, axis=1, keepdims=True)
+        fresh /= np.linalg.norm(fresh, axis=1, keepdims=True)
+        cosines = (stored * fresh).sum(axis=1)
+
+        return {
+            'model_name': self.embeddings.model_name,
+            'backend': self.embeddings.backend,
+            'sample_size': len(cosines),
+            'mean_cosine': round(float(cosines.mean()), 6),
+            'min_cosine': round(float(cosines.min()), 6),
+            'p5_cosine': round(float(np.percentile(cosines, 5)), 6),
+            'max_drift': round(float(1 - cosines.min()), 6),
+            'encode_seconds': round(elapsed, 3),
+            'products_per_second': round(len(cosines) / elapsed, 1) if elapsed else None
+        }
+
 # Create a singleton instance
-product_service = ProductService() 
\ No newline at end of file
+product_service = ProductService()